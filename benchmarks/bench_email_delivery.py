@@ -0,0 +1,43 @@
+"""
+Measure email delivery throughput in messages per second against a local SMTP sink.
+
+Usage:
+    python -m benchmarks.bench_email_delivery --messages 500 --pool-sizes 1 2 4 8 --latency 0.02
+"""
+import argparse
+import time
+from benchmarks.smtp_sink import SMTPSink
+from byline.models.user_models import User
+from byline.services.email_service import EmailService
+from byline.utils.concurrency import service_limits
+
+SUMMARY = "<h3>AI Agents</h3><ul><li>A paper about agents. <a href=\"https://arxiv.org/abs/0000.00000\">Link</a></li></ul>" * 5
+
+
+def run(messages: int, pool_size: int, latency: float, rate_limit: float = None) -> float:
+    sink = SMTPSink(latency=latency).start()
+    service_limits.configure(smtp=pool_size)
+    email_service = EmailService("bench@example.com", None, pool_size=pool_size, rate_limit=rate_limit, **sink.smtp_options())
+    users = [User(id=str(i), email=f"user{i}@example.com", user_interests=[]) for i in range(messages)]
+
+    start = time.perf_counter()
+    sent = email_service.send_many((user, SUMMARY) for user in users)
+    elapsed = time.perf_counter() - start
+
+    email_service.close()
+    sink.stop()
+    assert sent == messages == sink.messages, f"sent {sent}, sink received {sink.messages} of {messages}"
+    return messages / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pooled SMTP delivery")
+    parser.add_argument("--messages", type=int, default=500, help="Messages per configuration")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8], help="Pool sizes to compare")
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated server latency per message in seconds")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Messages per second limit")
+    args = parser.parse_args()
+
+    for pool_size in args.pool_sizes:
+        throughput = run(args.messages, pool_size, args.latency, args.rate_limit)
+        print(f"pool_size={pool_size:<3} {throughput:8.1f} msg/s")
@@ -0,0 +1,110 @@
+"""
+Measure the memory held by loaded users: plain dataclasses materialized in a list, against the
+compact interned models, both materialized and streamed.
+
+Users arrive as pages of JSON rows, like Supabase responses, so every row carries its own copies of
+the interest strings.
+
+Usage:
+    python -m benchmarks.bench_models --users 100000 --distinct-interests 2000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List
+from benchmarks.fakes import TOPICS, VOCABULARY
+from byline.models.user_models import InterestTable, User
+
+
+@dataclass
+class LegacyUserInterest:
+    """User interest as it was modelled before: a plain dataclass with its own list of strings"""
+    interest: str
+    subinterests: List[str]
+
+
+@dataclass
+class LegacyUser:
+    id: str
+    email: str
+    user_interests: List[LegacyUserInterest]
+
+
+def iter_pages(users: int, distinct_interests: int, page_size: int, seed: int) -> Iterator[List[Dict[str, Any]]]:
+    """Pages of decoded JSON rows: users with their interests, drawn from a shared pool"""
+    rng = random.Random(seed)
+    pool = [
+        {"interest": f"{TOPICS[i % len(TOPICS)]} {i}", "subinterests": rng.sample(VOCABULARY, k=rng.randint(0, 3))}
+        for i in range(distinct_interests)
+    ]
+    for start in range(0, users, page_size):
+        page = [
+            {
+                "id": f"{i:08d}-0000-4000-8000-{i:012d}",
+                "email": f"user{i}@example.com",
+                "interests": rng.sample(pool, k=rng.randint(1, 4))
+            }
+            for i in range(start, min(users, start + page_size))
+        ]
+        # Round-trip through JSON so each row owns fresh strings, as a network response would
+        yield json.loads(json.dumps(page))
+
+
+def load_legacy(pages) -> Iterator[LegacyUser]:
+    for page in pages:
+        for row in page:
+            yield LegacyUser(row["id"], row["email"], [
+                LegacyUserInterest(interest["interest"], interest["subinterests"]) for interest in row["interests"]
+            ])
+
+
+def load_compact(pages, table: InterestTable) -> Iterator[User]:
+    for page in pages:
+        for row in page:
+            yield User(row["id"], row["email"], interest_ids=tuple(
+                table.add(interest["interest"], interest["subinterests"]) for interest in row["interests"]
+            ))
+
+
+def measure(name: str, build, users: int):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<24} retained={current / 2**20:8.1f}MB ({current / users:6.0f} B/user)  "
+          f"peak={peak / 2**20:8.1f}MB  time={elapsed:5.2f}s")
+    return held
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure memory per loaded user")
+    parser.add_argument("--users", type=int, default=100000, help="Number of users loaded")
+    parser.add_argument("--distinct-interests", type=int, default=2000, help="Size of the shared interest pool")
+    parser.add_argument("--page-size", type=int, default=1000, help="Rows per simulated Supabase page")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    pages = lambda: iter_pages(args.users, args.distinct_interests, args.page_size, args.seed)
+    print(f"{args.users} users, {args.distinct_interests} distinct interests")
+
+    legacy = measure("dataclasses, list", lambda: list(load_legacy(pages())), args.users)
+    del legacy
+
+    table = InterestTable()
+    compact = measure("compact, list", lambda: (table, list(load_compact(pages(), table))), args.users)
+    print(f"{'':<24} interest table holds {len(table)} interests")
+    del compact, table
+
+    def stream():
+        table = InterestTable()
+        for _ in load_compact(pages(), table):
+            pass
+        return table
+    measure("compact, streamed", stream, args.users)
@@ -0,0 +1,114 @@
+"""
+Benchmark the local PaperIndex against a linear scan of snapshots and the live arXiv API search path.
+
+The index keeps every harvest of the last weeks and narrows each search to the requested window. A scan
+instead loads and tokenizes every snapshot harvested in the window before it can answer, then matches
+each paper in memory. Synthetic papers draw their words from a Zipf-distributed vocabulary, so query
+terms are as selective as they are in real abstracts.
+
+Usage:
+    python -m benchmarks.bench_paper_index --days 30 --papers-per-day 1500 --windows 1 3 7 --queries 200
+    python -m benchmarks.bench_paper_index --snapshot data/snapshots/arxiv_20250101.json --live
+"""
+import argparse
+import statistics
+import tempfile
+import time
+import os
+from datetime import datetime, timedelta
+from benchmarks.fakes import synthesize_history
+from byline.services.arxiv_harvest import PaperSnapshot
+from byline.services.arxiv_tools import ArxivTools
+from byline.services.paper_index import PaperIndex
+
+QUERIES = [
+    "AI agents", "quantum computing", "large language models reasoning", "diffusion models vision",
+    "reinforcement learning robotics", "retrieval augmented generation", "quantum error correction",
+    "graph neural network", "alignment safety", "federated learning privacy"
+]
+
+
+def time_queries(search, queries: list) -> list:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, int(round(0.95 * len(latencies))) - 1)]
+    print(f"{name:<16} n={len(latencies):<5} mean={statistics.mean(latencies):9.2f}ms "
+          f"p50={statistics.median(latencies):9.2f}ms p95={p95:9.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark local paper index vs snapshot scan and live arXiv search")
+    parser.add_argument("--snapshot", help="Harvested snapshot to index as a single day (defaults to synthetic history)")
+    parser.add_argument("--days", type=int, default=30, help="Days of synthetic harvests kept in the index")
+    parser.add_argument("--papers-per-day", type=int, default=1500, help="Synthetic papers per daily harvest")
+    parser.add_argument("--vocabulary", type=int, default=30000, help="Size of the synthetic vocabulary")
+    parser.add_argument("--windows", type=int, nargs="+", default=[1, 3, 7], help="Search windows in days to compare")
+    parser.add_argument("--queries", type=int, default=200, help="Number of local queries per window")
+    parser.add_argument("--live", action="store_true", help="Also time the live arXiv API path")
+    parser.add_argument("--live-queries", type=int, default=5, help="Number of live queries to run")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        snapshot = PaperSnapshot.load(args.snapshot)
+        history = [(snapshot.harvested_at or datetime.now().isoformat(), snapshot.papers)]
+    else:
+        history = synthesize_history(args.days, args.papers_per_day, args.vocabulary)
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+    total = sum(len(papers) for _, papers in history)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = PaperIndex(os.path.join(tmp_dir, "papers.db"))
+
+        start = time.perf_counter()
+        for harvested_at, papers in history:
+            index.add_papers(papers, seen_at=harvested_at)
+        print(f"Indexed {total} papers from {len(history)} harvests in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        index.add_papers(history[-1][1], seen_at=history[-1][0])
+        print(f"Incremental refresh with no new papers took {time.perf_counter() - start:.2f}s")
+
+        index.close()
+        snapshot_paths = []
+        for day, (harvested_at, papers) in enumerate(history):
+            snapshot_paths.append(os.path.join(tmp_dir, f"snapshot_{day}.json"))
+            PaperSnapshot(papers, harvested_at).save(snapshot_paths[-1])
+
+        for window in args.windows:
+            # Cold start is what a fresh process (a shard, a rerun) pays before its first result: opening
+            # the index, or loading and tokenizing every snapshot harvested inside the window
+            start = time.perf_counter()
+            index = PaperIndex(os.path.join(tmp_dir, "papers.db"), read_only=True)
+            index_tools = ArxivTools(paper_store=index)
+            index_tools.search_papers_by_time_interval(queries[0], window, 10)
+            index_cold = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            in_window = [paper for path in snapshot_paths[-window:] for paper in PaperSnapshot.load(path).papers]
+            snapshot_tools = ArxivTools(paper_store=PaperSnapshot(in_window, history[-1][0]))
+            snapshot_tools.search_papers_by_time_interval(queries[0], window, 10)
+            scan_cold = (time.perf_counter() - start) * 1000
+
+            print(f"{window}-day window ({len(in_window)} papers): cold start index={index_cold:.1f}ms scan={scan_cold:.1f}ms")
+            report("  index", time_queries(lambda q: index_tools.search_papers_by_time_interval(q, window, 10), queries))
+            report("  scan", time_queries(lambda q: snapshot_tools.search_papers_by_time_interval(q, window, 10), queries))
+            index.close()
+
+        index = PaperIndex(os.path.join(tmp_dir, "papers.db"))
+        if len(history) > 7:
+            start = time.perf_counter()
+            pruned = index.prune(datetime.now() - timedelta(days=7))
+            print(f"Pruned {pruned} papers older than 7 days in {time.perf_counter() - start:.2f}s")
+        index.close()
+
+    if args.live:
+        live_tools = ArxivTools()
+        report("live", time_queries(lambda q: live_tools.search_papers_by_time_interval(q, 1, 10), QUERIES[:args.live_queries]))
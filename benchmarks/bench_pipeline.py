@@ -0,0 +1,162 @@
+"""
+End-to-end offline benchmark of the daily pipeline with local stand-ins for every upstream service:
+replayed/scripted OpenAI responses, a canned arXiv Atom server, synthesized users and an SMTP sink.
+
+Usage:
+    python -m benchmarks.bench_pipeline --users 10000 --papers 2000 --llm-latency 0.2
+    python -m benchmarks.bench_pipeline --users 500 --live-search --arxiv-latency 0.5
+    python -m benchmarks.bench_pipeline --recording recordings.jsonl
+    python -m benchmarks.bench_pipeline --users 1000 --batch --batch-error-rate 0.05
+"""
+import argparse
+import logging
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from benchmarks.fakes import ArxivFeedServer, FakeOpenAI, synthesize_papers, synthesize_users, CATEGORIES
+from benchmarks.smtp_sink import SMTPSink
+from byline.pipeline import run_pipeline
+from byline.services.arxiv_harvest import ArxivHarvester
+from byline.services.email_service import EmailService
+from byline.services.paper_index import PaperIndex
+from byline.services.paper_ranker import PaperRanker
+from byline.services.openai_batch import BatchRunner
+from byline.services.paper_summaries import PaperSummaryStore
+from byline.services.summary_agent import ExecutiveSummaryAgent
+from byline.utils.concurrency import service_limits
+from byline.utils.http_client import arxiv_http
+from byline.utils.tracing import tracer
+from byline.utils.work_queue import DigestQueue
+
+
+def run(args) -> dict:
+    papers = synthesize_papers(args.papers)
+    feed_server = ArxivFeedServer(papers, latency=args.arxiv_latency, error_rate=args.arxiv_error_rate).start()
+    smtp_sink = SMTPSink(latency=args.smtp_latency).start()
+    service_limits.configure(openai=args.openai_concurrency, arxiv=args.arxiv_concurrency, smtp=args.smtp_pool)
+    arxiv_http.configure(rate=args.arxiv_rate, burst=max(1, args.arxiv_concurrency))
+    arxiv_http.backoff_base = 0.05
+    tracer.reset()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paper_index = None
+        ranker = None
+        if not args.live_search:
+            harvester = ArxivHarvester(snapshot_dir=tmp_dir)
+            harvester.client.query_url_format = feed_server.query_url_format
+            snapshot = harvester.harvest(CATEGORIES)
+            paper_index = PaperIndex(os.path.join(tmp_dir, "papers.db"))
+            with tracer.span("index.refresh"):
+                paper_index.add_papers(snapshot.papers, seen_at=snapshot.harvested_at)
+            if not args.no_rank:
+                ranker = PaperRanker(os.path.join(tmp_dir, "vectors"))
+                with tracer.span("ranker.refresh"):
+                    ranker.add_papers(snapshot.papers)
+
+        paper_summary_store = None if args.no_paper_summaries else PaperSummaryStore(os.path.join(tmp_dir, "paper_summaries.db"))
+        agent = ExecutiveSummaryAgent("sk-offline-benchmark", paper_store=paper_index, ranker=ranker, paper_summary_store=paper_summary_store)
+        agent.client = FakeOpenAI(latency=args.llm_latency, recording_path=args.recording, batch_error_rate=args.batch_error_rate)
+        agent.arxiv_tools.client.query_url_format = feed_server.query_url_format
+        if agent.paper_summaries is not None:
+            agent.paper_summaries.client = agent.client
+
+        email_service = EmailService("bench@example.com", None, pool_size=args.smtp_pool, **smtp_sink.smtp_options())
+        digest_queue = DigestQueue(os.path.join(tmp_dir, "digests.db"))
+
+        users = synthesize_users(args.users, distinct_interests=args.distinct_interests)
+        start = time.perf_counter()
+        batch_stats = None
+        if args.batch:
+            users = list(users)
+            runner = BatchRunner(agent.client, poll_interval=0.01)
+            batch_stats = agent.prepare_batch([interest for user in users for interest in user.user_interests], runner,
+                                              workers=args.interest_workers)
+            batch_stats["elapsed_s"] = round(time.perf_counter() - start, 3)
+        stats = run_pipeline(
+            users,
+            agent,
+            email_service,
+            digest_queue,
+            workers=args.workers,
+            interest_workers=args.interest_workers,
+            single_pass=args.single_pass
+        )
+        elapsed = time.perf_counter() - start
+
+        agent.close()
+        email_service.close()
+        digest_queue.close()
+
+    feed_server.stop()
+    smtp_sink.stop()
+
+    _, peak_traced = tracemalloc.get_traced_memory()
+    user_latency = tracer.stage("pipeline.user")
+    return tracer.write_report(args.report, extra={
+        "benchmark": {
+            "users": args.users,
+            "papers": args.papers,
+            "elapsed": elapsed,
+            "throughput_users_per_second": args.users / elapsed if elapsed else 0.0,
+            "user_latency": user_latency,
+            "messages_received": smtp_sink.messages,
+            "arxiv_requests": feed_server.requests,
+            "arxiv_queue_wait": tracer.stage("arxiv.queue_wait"),
+            "arxiv_network": tracer.stage("arxiv.network"),
+            "llm_calls": agent.client.responses.calls,
+            "batch_requests": agent.client.batches.requests,
+            "batch": batch_stats,
+            "peak_traced_memory_mb": peak_traced / 1024 / 1024,
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        },
+        "pipeline": stats
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--users", type=int, default=1000, help="Number of synthesized users")
+    parser.add_argument("--distinct-interests", type=int, default=50, help="Size of the interest pool users draw from")
+    parser.add_argument("--papers", type=int, default=2000, help="Number of papers served by the fake arXiv API")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake responses.create call")
+    parser.add_argument("--arxiv-latency", type=float, default=0.0, help="Seconds per fake arXiv API request")
+    parser.add_argument("--smtp-latency", type=float, default=0.0, help="Seconds per message at the SMTP sink")
+    parser.add_argument("--recording", help="JSONL recording of responses.create calls to replay")
+    parser.add_argument("--live-search", action="store_true", help="Skip the harvest and send every search to the fake arXiv API")
+    parser.add_argument("--no-rank", action="store_true", help="Disable the local pre-ranking of papers per interest")
+    parser.add_argument("--no-paper-summaries", action="store_true",
+                        help="Have the agent write paper summaries in every digest instead of sharing per-paper summaries")
+    parser.add_argument("--batch", action="store_true",
+                        help="Select and summarize papers for all interests through the fake Batch API before the run")
+    parser.add_argument("--batch-error-rate", type=float, default=0.0, help="Fraction of fake batch requests that fail")
+    parser.add_argument("--single-pass", action="store_true", help="Write each digest in one agent conversation")
+    parser.add_argument("--workers", type=int, default=8, help="Users processed concurrently")
+    parser.add_argument("--interest-workers", type=int, default=8, help="Interest summaries generated concurrently")
+    parser.add_argument("--openai-concurrency", type=int, default=8, help="Concurrent fake OpenAI calls")
+    parser.add_argument("--arxiv-rate", type=float, default=None, help="arXiv requests per second (default: unlimited)")
+    parser.add_argument("--arxiv-error-rate", type=float, default=0.0, help="Fraction of fake arXiv requests answered with 503")
+    parser.add_argument("--arxiv-concurrency", type=int, default=1, help="Concurrent fake arXiv requests")
+    parser.add_argument("--smtp-pool", type=int, default=4, help="Pooled SMTP connections")
+    parser.add_argument("--report", default="bench_report.json", help="Path of the JSON benchmark report")
+    parser.add_argument("--verbose", action="store_true", help="Show INFO logs from the pipeline")
+    args = parser.parse_args()
+    if args.batch and (args.live_search or args.no_rank or args.no_paper_summaries or args.single_pass):
+        parser.error("--batch needs the harvest, ranking and paper summaries, and cannot be combined with --single-pass")
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    tracemalloc.start()
+    report = run(args)
+
+    bench = report["benchmark"]
+    latency = bench["user_latency"]
+    print(f"users={bench['users']} elapsed={bench['elapsed']:.2f}s throughput={bench['throughput_users_per_second']:.1f} users/s")
+    print(f"per-user latency p50={latency['p50'] * 1000:.0f}ms p95={latency['p95'] * 1000:.0f}ms p99={latency['p99'] * 1000:.0f}ms")
+    print(f"llm_calls={bench['llm_calls']} batch_requests={bench['batch_requests']} arxiv_requests={bench['arxiv_requests']} emails={bench['messages_received']}")
+    print(f"arxiv queue wait p95={bench['arxiv_queue_wait']['p95'] * 1000:.0f}ms network p95={bench['arxiv_network']['p95'] * 1000:.0f}ms "
+          f"retries={report['counters'].get('arxiv.retries', 0):.0f}")
+    print(f"peak traced memory={bench['peak_traced_memory_mb']:.1f}MB max RSS={bench['max_rss_mb']:.1f}MB")
+    if bench["batch"] is not None:
+        print(f"batch prepared {bench['batch']['interests_prepared']}/{bench['batch']['interests']} interests "
+              f"in {bench['batch']['elapsed_s']:.2f}s")
@@ -0,0 +1,104 @@
+"""
+Benchmark email rendering per 10k emails: per-recipient f-strings and regex filtering against the
+precompiled templates and cached per-interest fragments.
+
+Usage:
+    python -m benchmarks.bench_render --users 10000 --distinct-interests 200
+    python -m benchmarks.bench_render --no-watermarks
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+from byline.models.user_models import User, UserInterest
+from byline.services.templates.email_template import render_email_body, render_email_subject
+from byline.services.templates.render import FragmentCache
+from byline.utils.watermarks import assemble_digest, drop_reported_papers, extract_paper_ids
+
+
+def legacy_email(summary: str) -> tuple:
+    subject = f"[Byline Update] | {datetime.now().strftime('%Y-%m-%d')}"
+    html = f"""
+        <html>
+        <body>
+            <h2>Research Summary</h2>
+            <hr/>
+            <div style="white-space: pre-wrap; font-family: Arial, sans-serif;">
+            {summary}
+            </div>
+        </body>
+        </html>
+        """
+    return subject, html
+
+
+def synthesize_summary(rng: random.Random, topic: str, papers: int) -> str:
+    items = "\n".join(
+        f'    <li>A {rng.choice(["new", "scalable", "robust"])} approach to {topic} with strong results on standard '
+        f'benchmarks and a careful ablation study. <a href="http://arxiv.org/abs/2501.{rng.randint(0, 4999):05d}v1">'
+        f'Link to the paper</a></li>'
+        for _ in range(papers)
+    )
+    return f"<h3>{topic.title()}</h3>\n<ul>\n{items}\n</ul>"
+
+
+def report(name: str, seconds: float, emails: int):
+    print(f"{name:<28} {seconds * 1000:9.1f}ms total  {seconds / emails * 1e6:8.1f}us/email  "
+          f"{seconds / emails * 10000 * 1000:9.1f}ms per 10k emails")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark email rendering")
+    parser.add_argument("--users", type=int, default=10000, help="Number of emails rendered")
+    parser.add_argument("--distinct-interests", type=int, default=200, help="Size of the shared interest pool")
+    parser.add_argument("--interests-per-user", type=int, default=3, help="Interests per user")
+    parser.add_argument("--reported", type=int, default=2, help="Papers already reported to each user")
+    parser.add_argument("--no-watermarks", action="store_true", help="Skip the reported-paper filtering")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pool = [
+        UserInterest(interest=f"topic {i}", subinterests=[f"method {i}", f"application {i % 17}"])
+        for i in range(args.distinct_interests)
+    ]
+    summaries = {interest.canonical_key(): synthesize_summary(rng, interest.interest, rng.randint(2, 4)) for interest in pool}
+    all_ids = sorted({paper for summary in summaries.values() for paper in extract_paper_ids(summary)})
+    users = [
+        User(id=str(i), email=f"user{i}@example.com", user_interests=rng.sample(pool, args.interests_per_user))
+        for i in range(args.users)
+    ]
+    reported = {user.id: set(rng.sample(all_ids, args.reported)) for user in users}
+    run_date = datetime.now().strftime("%Y-%m-%d")
+    watermarks = not args.no_watermarks
+    print(f"{args.users} emails, {args.distinct_interests} distinct interests, "
+          f"{args.interests_per_user} interests per user, watermarks {'on' if watermarks else 'off'}")
+
+    legacy_output = []
+    start = time.perf_counter()
+    for user in users:
+        combined = "\n".join(summaries[user_interest.canonical_key()] for user_interest in user.user_interests)
+        if watermarks:
+            already = reported[user.id] & set(extract_paper_ids(combined))
+            combined, _ = drop_reported_papers(combined, already)
+        legacy_output.append(legacy_email(combined))
+    report("emails (per recipient)", time.perf_counter() - start, len(users))
+
+    fragments = FragmentCache()
+    output = []
+    start = time.perf_counter()
+    for user in users:
+        if watermarks:
+            parts = [
+                fragments.get(key, lambda: drop_reported_papers(summaries[key], set()))
+                for key in (user_interest.canonical_key() for user_interest in user.user_interests)
+            ]
+            already = reported[user.id] & {paper for _, ids in parts for paper in ids}
+            combined, _ = assemble_digest(parts, already)
+        else:
+            combined = "\n".join(summaries[user_interest.canonical_key()] for user_interest in user.user_interests)
+        output.append((render_email_subject(run_date), render_email_body(combined)))
+    report("emails (cached fragments)", time.perf_counter() - start, len(users))
+
+    assert output == legacy_output, "Cached rendering produced different emails"
+    print(f"Outputs identical. Fragment cache: {fragments.stats()}")
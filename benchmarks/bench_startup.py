@@ -0,0 +1,97 @@
+"""
+Profile exec.py cold start with `python -X importtime`: the modules every run imported eagerly
+before, against what each mode imports now.
+
+`--help` and an empty `--stage deliver` run exec.py for real, in a scratch directory with dummy
+credentials and nothing queued, so no network is touched. The generate path needs OpenAI, so its
+import set is timed on its own.
+
+Usage:
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Set, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXEC = os.path.join(ROOT, "exec.py")
+HEAVY = ["openai", "supabase", "yagmail", "arxiv", "requests", "numpy", "PyPDF2"]
+
+# Everything exec.py imported at module load before imports were made lazy
+EAGER_IMPORTS = [
+    "byline.utils.supabase_client", "byline.services.email_service", "byline.services.email_delivery",
+    "byline.utils.setup", "byline.services.summary_agent", "byline.services.agent_context",
+    "byline.services.arxiv_harvest", "byline.services.paper_index", "byline.services.paper_ranker",
+    "byline.services.paper_reader", "PyPDF2", "byline.utils.dataloaders", "byline.utils.concurrency",
+    "byline.utils.http_client", "byline.utils.cache", "byline.utils.watermarks", "byline.utils.work_queue",
+    "byline.utils.tracing", "byline.pipeline"
+]
+
+# What the generate branch of exec.py imports for a --test run with the default harvest and ranking
+GENERATE_IMPORTS = [
+    "byline.utils.setup", "byline.utils.concurrency", "byline.utils.tracing", "byline.utils.work_queue",
+    "byline.utils.http_client", "byline.utils.watermarks", "byline.services.arxiv_harvest",
+    "byline.services.paper_index", "byline.services.paper_ranker", "byline.pipeline",
+    "byline.services.agent_context", "byline.services.summary_agent", "byline.utils.cache",
+    "byline.utils.dataloaders"
+]
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Set[str]]:
+    """Total import time in ms, and the name of every module imported"""
+    total = 0
+    modules = set()
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if match:
+            modules.add(match.group(4))
+            if len(match.group(3)) == 1:
+                total += int(match.group(2))
+    return total / 1000, modules
+
+
+def run(command: List[str], cwd: str, env: Dict[str, str]) -> Tuple[float, float, Set[str]]:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime"] + command, cwd=cwd, env=env,
+                            capture_output=True, text=True)
+    wall = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{result.stderr[-2000:]}")
+    imports, modules = parse_importtime(result.stderr)
+    return wall, imports, modules
+
+
+def heavy_modules(modules: Set[str]) -> str:
+    loaded = [name for name in HEAVY if name in modules]
+    return ", ".join(loaded) or "none"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile exec.py cold start")
+    parser.add_argument("--repeat", type=int, default=5, help="Cold starts per mode; the median is reported")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=ROOT, SENDER_EMAIL="bench@example.com", SENDER_PASSWORD="unused",
+               PYTHONDONTWRITEBYTECODE="1")
+    for key in ["OPENAI_API_KEY", "SUPABASE_URL", "SUPABASE_SERVICE_KEY", "EXA_API_KEY"]:
+        env.pop(key, None)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        modes = [
+            ("eager imports (before)", ["-c", "import " + ", ".join(EAGER_IMPORTS)]),
+            ("exec.py --help", [EXEC, "--help"]),
+            ("exec.py --stage deliver", [EXEC, "--stage", "deliver", "--report", os.path.join(scratch, "report.json")]),
+            ("generate imports", ["-c", "import " + ", ".join(GENERATE_IMPORTS)]),
+        ]
+        print(f"{'mode':<26} {'wall':>9} {'imports':>9}  heavy modules loaded")
+        for name, command in modes:
+            runs = [run(command, scratch, env) for _ in range(args.repeat)]
+            wall = statistics.median(r[0] for r in runs)
+            imports = statistics.median(r[1] for r in runs)
+            print(f"{name:<26} {wall:7.0f}ms {imports:7.0f}ms  {heavy_modules(runs[-1][2])}")
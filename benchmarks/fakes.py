@@ -0,0 +1,427 @@
+"""
+Local stand-ins for the pipeline's upstream services: OpenAI Responses, the arXiv Atom API,
+the Supabase user source and (via smtp_sink) the SMTP server.
+"""
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+from byline.models.user_models import User, UserInterest
+from byline.utils.cache import DiskCache
+from byline.utils.dataloaders import load_test_users
+
+VOCABULARY = [
+    "agent", "agents", "language", "model", "models", "quantum", "computing", "reinforcement",
+    "learning", "vision", "transformer", "diffusion", "retrieval", "graph", "neural", "network",
+    "robotics", "planning", "reasoning", "benchmark", "alignment", "safety", "error", "correction",
+    "qubit", "optimization", "federated", "privacy", "multimodal", "speech", "translation", "code"
+]
+CATEGORIES = ["cs.AI", "cs.CL", "cs.CV", "cs.LG", "cs.RO", "quant-ph", "stat.ML"]
+TOPICS = [
+    "Large Language Models", "Reinforcement Learning", "Computer Vision", "Quantum Error Correction",
+    "Robotics", "Graph Neural Networks", "AI Safety", "Speech Recognition", "Federated Learning",
+    "Diffusion Models", "Retrieval Augmented Generation", "Multimodal Learning"
+]
+
+
+def synthesize_papers(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Generate papers in the search tool's result shape, submitted within the last two days"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    papers = []
+    for i in range(count):
+        published = (now - timedelta(hours=rng.randint(0, 47))).replace(microsecond=0).isoformat()
+        papers.append({
+            "id": f"http://arxiv.org/abs/2501.{i:05d}v1",
+            "title": " ".join(rng.choices(VOCABULARY, k=8)).title(),
+            "authors": [f"Author {rng.randint(1, 5000)}" for _ in range(rng.randint(1, 6))],
+            "summary": " ".join(rng.choices(VOCABULARY, k=150)),
+            "published": published,
+            "updated": published,
+            "categories": rng.sample(CATEGORIES, k=2),
+            "pdf_url": f"http://arxiv.org/pdf/2501.{i:05d}v1",
+            "primary_category": rng.choice(CATEGORIES)
+        })
+    return papers
+
+
+def synthesize_history(days: int, papers_per_day: int, vocabulary_size: int = 30000,
+                       seed: int = 0) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Generate one harvest per day for the last `days` days, oldest first, as (harvested_at, papers)
+
+    Words follow a Zipf distribution over a large vocabulary, with the topical terms of VOCABULARY
+    placed in its mid-frequency range, so query terms match a few percent of abstracts as they do in
+    real arXiv text rather than every paper.
+    """
+    rng = random.Random(seed)
+    words = [f"term{rank}" for rank in range(vocabulary_size)]
+    for position, word in enumerate(VOCABULARY):
+        words[100 + position * 40] = word
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) ** 1.05 for rank in range(vocabulary_size)))
+
+    now = datetime.now().replace(microsecond=0)
+    history = []
+    for day in range(days):
+        harvested_at = now - timedelta(days=days - 1 - day)
+        papers = []
+        for i in range(papers_per_day):
+            number = f"{day:03d}{i:05d}"
+            published = (harvested_at - timedelta(hours=rng.randint(0, 71))).isoformat()
+            papers.append({
+                "id": f"http://arxiv.org/abs/2501.{number}v1",
+                "title": " ".join(rng.choices(words, cum_weights=cum_weights, k=10)).title(),
+                "authors": [f"Author {rng.randint(1, 50000)}" for _ in range(rng.randint(1, 6))],
+                "summary": " ".join(rng.choices(words, cum_weights=cum_weights, k=150)),
+                "published": published,
+                "updated": published,
+                "categories": rng.sample(CATEGORIES, k=2),
+                "pdf_url": f"http://arxiv.org/pdf/2501.{number}v1",
+                "primary_category": rng.choice(CATEGORIES)
+            })
+        history.append((harvested_at.isoformat(), papers))
+    return history
+
+
+def synthesize_users(count: int, json_file_path: str = "data/user_interests.json", distinct_interests: int = 50,
+                     seed: int = 0) -> Iterator[User]:
+    """
+    Lazily generate users whose interests are drawn from the test users file plus synthetic variants
+
+    Args:
+        count: Number of users to generate
+        json_file_path: Test users file the interest pool is seeded from
+        distinct_interests: Size of the interest pool users subscribe to
+        seed: Random seed
+    """
+    rng = random.Random(seed)
+    pool = [interest for user in load_test_users(json_file_path) for interest in user.user_interests]
+    while len(pool) < distinct_interests:
+        topic = TOPICS[len(pool) % len(TOPICS)]
+        subinterests = rng.sample(VOCABULARY, k=rng.randint(0, 3))
+        pool.append(UserInterest(interest=topic, subinterests=subinterests))
+
+    for i in range(count):
+        yield User(
+            id=f"user-{i}",
+            email=f"user{i}@example.com",
+            user_interests=rng.sample(pool, k=min(len(pool), rng.randint(1, 4)))
+        )
+
+
+class FakeResponse:
+    """Minimal object with the attributes the agent reads from a Responses API result"""
+
+    def __init__(self, output: List[Any], output_text: str, input_tokens: int, output_tokens: int):
+        self.output = output
+        self.output_text = output_text
+        self.usage = SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens)
+
+
+class FakeResponses:
+    """
+    Replays `responses.create` results with configurable latency
+
+    Recorded responses (see RecordingResponses) are replayed by content hash of the request. Requests
+    without a recording follow a scripted conversation: the first turn searches arXiv for the user's
+    interests, the next turn writes an HTML summary of the papers returned by the tool, or selects
+    the first of them as JSON when the prompt asks for a selection. Requests without tools are paper
+    summary requests and get one sentence per paper.
+    """
+
+    def __init__(self, latency: float = 0.0, recording_path: Optional[str] = None):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.recordings: Dict[str, Dict[str, Any]] = {}
+        if recording_path:
+            with open(recording_path, "r") as f:
+                for line in f:
+                    record = json.loads(line)
+                    self.recordings[record["key"]] = record["response"]
+
+    def create(self, model: str, input: List[Any], tools: List[Dict[str, Any]] = None, **kwargs) -> FakeResponse:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.answer(model, input, tools, **kwargs)
+
+    def answer(self, model: str, input: List[Any], tools: List[Dict[str, Any]] = None, **kwargs) -> FakeResponse:
+        """The response to a request, without counting the call or waiting"""
+        input_tokens = len(json.dumps(input, default=str)) // 4
+        recorded = self.recordings.get(request_key(model, input, tools, kwargs))
+        if recorded is not None:
+            output = [SimpleNamespace(**item) for item in recorded["output"]]
+            return FakeResponse(output, recorded["output_text"], input_tokens, len(recorded["output_text"]) // 4)
+
+        prompt = input[0]["content"]
+        if not tools:
+            papers = [json.loads(line) for line in re.findall(r"^\s*(\{\"id\": .*\})\s*$", prompt, re.MULTILINE)]
+            text = json.dumps({paper["id"]: f"{paper['title']} reports new results." for paper in papers})
+            return FakeResponse([SimpleNamespace(type="message")], text, input_tokens, len(text) // 4)
+
+        tool_outputs = [item for item in input if isinstance(item, dict) and item.get("type") == "function_call_output"]
+        queries = re.findall(r"'interest': '([^']*)'", prompt) or ["research"]
+        if not tool_outputs and kwargs.get("tool_choice") != "none":
+            # One search per interest in the prompt, issued as parallel calls in a single turn
+            calls = [
+                SimpleNamespace(
+                    type="function_call",
+                    call_id=f"call_{self.calls}_{i}",
+                    name=tools[0]["name"],
+                    arguments=json.dumps({"query": query, "days_back": 1, "max_results": 10})
+                )
+                for i, query in enumerate(queries)
+            ]
+            return FakeResponse(calls, "", input_tokens, 30 * len(calls))
+
+        if '{"interests": [' in prompt:
+            selections = [
+                {
+                    "interest": query,
+                    "papers": [paper["id"] for paper in json.loads(tool_output["output"]).get("results", [])[:3]]
+                }
+                for query, tool_output in zip(queries, tool_outputs)
+            ]
+            text = json.dumps({"interests": selections})
+            return FakeResponse([SimpleNamespace(type="message")], text, input_tokens, len(text) // 4)
+
+        sections = []
+        for tool_output in tool_outputs:
+            items = [
+                f"<li>{escape(paper['title'])}. <a href=\"{paper['id']}\">Link to the paper</a></li>"
+                for paper in json.loads(tool_output["output"]).get("results", [])[:3]
+            ]
+            sections.append(f"<h3>Research update</h3><ul>{''.join(items) or '<li>No papers found.</li>'}</ul>")
+        text = "".join(sections) or "<h3>Research update</h3><ul><li>No papers found.</li></ul>"
+        return FakeResponse([SimpleNamespace(type="message")], text, input_tokens, len(text) // 4)
+
+
+def request_key(model: str, input: List[Any], tools: Optional[List[Dict[str, Any]]], options: Dict[str, Any]) -> str:
+    return DiskCache.make_key(model, input, tools, options.get("tool_choice", "auto"))
+
+
+class RecordingResponses:
+    """Wraps a real `client.responses` and appends every request/response pair to a JSONL recording"""
+
+    def __init__(self, responses, recording_path: str):
+        self.responses = responses
+        self.recording_path = recording_path
+        self._lock = threading.Lock()
+
+    def create(self, model: str, input: List[Any], tools: List[Dict[str, Any]] = None, **kwargs):
+        key = request_key(model, input, tools, kwargs)
+        if tools is not None:
+            kwargs["tools"] = tools
+        response = self.responses.create(model=model, input=input, **kwargs)
+        record = {
+            "key": key,
+            "response": {
+                "output": [item.model_dump(mode="json", exclude_none=True) for item in response.output],
+                "output_text": response.output_text
+            }
+        }
+        with self._lock, open(self.recording_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        return response
+
+
+class FakeFiles:
+    """In-memory stand-in for `client.files`: uploads and downloads of batch input and output files"""
+
+    def __init__(self):
+        self.files: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def create(self, file, purpose: str):
+        name, content = file
+        data = content.read() if hasattr(content, "read") else content
+        with self._lock:
+            file_id = f"file-{len(self.files)}"
+            self.files[file_id] = data
+        return SimpleNamespace(id=file_id, filename=name, purpose=purpose, bytes=len(data))
+
+    def add(self, text: str) -> str:
+        return self.create(("output.jsonl", text.encode("utf-8")), "batch_output").id
+
+    def content(self, file_id: str):
+        return SimpleNamespace(text=self.files[file_id].decode("utf-8"))
+
+
+class FakeBatches:
+    """
+    Stand-in for `client.batches` on top of FakeResponses
+
+    A batch reports `in_progress` until it has been polled `polls` times, then answers every request
+    in its input file at once and completes. A fraction of the requests can be made to fail.
+    """
+
+    def __init__(self, files: FakeFiles, responses: FakeResponses, polls: int = 2, error_rate: float = 0.0, seed: int = 0):
+        self.files = files
+        self.responses = responses
+        self.polls = polls
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.batches: Dict[str, SimpleNamespace] = {}
+        self.requests = 0
+
+    def create(self, input_file_id: str, endpoint: str, completion_window: str, **kwargs):
+        lines = self.files.files[input_file_id].decode("utf-8").splitlines()
+        batch = SimpleNamespace(
+            id=f"batch-{len(self.batches)}", status="validating", endpoint=endpoint, input_file_id=input_file_id,
+            output_file_id=None, error_file_id=None, polls=0,
+            request_counts=SimpleNamespace(total=len(lines), completed=0, failed=0)
+        )
+        self.batches[batch.id] = batch
+        return batch
+
+    def retrieve(self, batch_id: str):
+        batch = self.batches[batch_id]
+        batch.polls += 1
+        if batch.status in ("validating", "in_progress"):
+            batch.status = "in_progress"
+            if batch.polls >= self.polls:
+                self._complete(batch)
+        return batch
+
+    def cancel(self, batch_id: str):
+        batch = self.batches[batch_id]
+        batch.status = "cancelled"
+        return batch
+
+    def _complete(self, batch: SimpleNamespace):
+        outputs, errors = [], []
+        for line in self.files.files[batch.input_file_id].decode("utf-8").splitlines():
+            request = json.loads(line)
+            self.requests += 1
+            if self.error_rate and self.rng.random() < self.error_rate:
+                errors.append({"custom_id": request["custom_id"], "response": {"status_code": 500, "body": {}},
+                               "error": {"code": "server_error", "message": "Simulated failure"}})
+                continue
+            body = dict(request["body"])
+            response = self.responses.answer(body.pop("model"), body.pop("input"), body.pop("tools", None), **body)
+            outputs.append({
+                "custom_id": request["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": {
+                        "output": [{"type": "message", "content": [{"type": "output_text", "text": response.output_text}]}]
+                        if response.output_text else [vars(item) for item in response.output],
+                        "usage": vars(response.usage)
+                    }
+                },
+                "error": None
+            })
+        batch.output_file_id = self.files.add("".join(json.dumps(record) + "\n" for record in outputs))
+        if errors:
+            batch.error_file_id = self.files.add("".join(json.dumps(record) + "\n" for record in errors))
+        batch.request_counts.completed = len(outputs)
+        batch.request_counts.failed = len(errors)
+        batch.status = "completed"
+
+
+class FakeOpenAI:
+    """Drop-in for `OpenAI()` exposing `responses`, and `files` and `batches` for the Batch API"""
+
+    def __init__(self, latency: float = 0.0, recording_path: Optional[str] = None, batch_polls: int = 2,
+                 batch_error_rate: float = 0.0):
+        self.responses = FakeResponses(latency, recording_path)
+        self.files = FakeFiles()
+        self.batches = FakeBatches(self.files, self.responses, polls=batch_polls, error_rate=batch_error_rate)
+
+
+def atom_feed(papers: List[Dict[str, Any]], total: int, start: int) -> bytes:
+    """Render papers as an arXiv API Atom feed page"""
+    entries = []
+    for paper in papers:
+        authors = "".join(f"<author><name>{escape(name)}</name></author>" for name in paper["authors"])
+        categories = "".join(f'<category term="{category}" scheme="http://arxiv.org/schemas/atom"/>' for category in paper["categories"])
+        entries.append(
+            "<entry>"
+            f"<id>{paper['id']}</id>"
+            f"<updated>{paper['updated']}Z</updated>"
+            f"<published>{paper['published']}Z</published>"
+            f"<title>{escape(paper['title'])}</title>"
+            f"<summary>{escape(paper['summary'])}</summary>"
+            f"{authors}"
+            f'<link href="{paper["id"]}" rel="alternate" type="text/html"/>'
+            f'<link title="pdf" href="{paper["pdf_url"]}" rel="related" type="application/pdf"/>'
+            f'<arxiv:primary_category term="{paper["primary_category"]}" scheme="http://arxiv.org/schemas/atom"/>'
+            f"{categories}"
+            "</entry>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+        'xmlns:arxiv="http://arxiv.org/schemas/atom">'
+        "<title>ArXiv Query</title>"
+        f"<opensearch:totalResults>{total}</opensearch:totalResults>"
+        f"<opensearch:startIndex>{start}</opensearch:startIndex>"
+        f"<opensearch:itemsPerPage>{len(papers)}</opensearch:itemsPerPage>"
+        f"{''.join(entries)}"
+        "</feed>"
+    ).encode("utf-8")
+
+
+class _ArxivHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        start = int(params.get("start", ["0"])[0])
+        page_size = int(params.get("max_results", ["10"])[0])
+        papers = self.server.papers
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.requests += 1
+        if self.server.error_rate and self.server.rng.random() < self.server.error_rate:
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = atom_feed(papers[start:start + page_size], len(papers), start)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ArxivFeedServer(ThreadingHTTPServer):
+    """Serves a canned set of papers as arXiv API Atom pages on localhost, optionally failing a fraction with 503"""
+
+    daemon_threads = True
+
+    def __init__(self, papers: List[Dict[str, Any]], latency: float = 0.0, port: int = 0, error_rate: float = 0.0,
+                 seed: int = 0):
+        super().__init__(("127.0.0.1", port), _ArxivHandler)
+        self.papers = papers
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+
+    @property
+    def query_url_format(self) -> str:
+        """Value for `arxiv.Client.query_url_format` that points the client at this server"""
+        return f"http://127.0.0.1:{self.server_address[1]}/api/query?{{}}"
+
+    def start(self) -> "ArxivFeedServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,108 @@
+"""
+Minimal local SMTP server that accepts and discards messages, for benchmarks and offline runs.
+"""
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        self.reply("220 localhost byline SMTP sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip().upper()
+
+            if command.startswith("EHLO"):
+                self.wfile.write(b"250-localhost\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n")
+            elif command.startswith("HELO"):
+                self.reply("250 localhost")
+            elif command.startswith("MAIL") and self.server.rejecting:
+                self.reply("451 Temporarily unavailable")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                if self.server.take_disconnect():
+                    return
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b".\r\n", b".\n"):
+                        break
+                    size += len(data_line)
+                if self.server.latency:
+                    time.sleep(self.server.latency)
+                self.server.record(size)
+                self.reply("250 OK queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Threaded SMTP sink listening on localhost. Counts messages and bytes received."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0):
+        """
+        Args:
+            port: Port to listen on, 0 picks a free one
+            latency: Seconds to wait before acknowledging each message, to mimic a real server
+        """
+        super().__init__(("127.0.0.1", port), _SMTPHandler)
+        self.latency = latency
+        # Failure injection for tests: refuse every sender, or hang up on the next few messages
+        self.rejecting = False
+        self.disconnects = 0
+        self.messages = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def record(self, size: int):
+        with self._lock:
+            self.messages += 1
+            self.bytes_received += size
+
+    def take_disconnect(self) -> bool:
+        """Whether to drop the current connection, consuming one of the pending disconnects"""
+        with self._lock:
+            if self.disconnects <= 0:
+                return False
+            self.disconnects -= 1
+            return True
+
+    def start(self) -> "SMTPSink":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def smtp_options(self) -> dict:
+        """yagmail.SMTP options for connecting to this sink"""
+        return {
+            "host": "127.0.0.1",
+            "port": self.port,
+            "smtp_ssl": False,
+            "smtp_starttls": False,
+            "smtp_skip_login": True
+        }
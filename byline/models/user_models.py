@@ -1,29 +1,99 @@
-from dataclasses import dataclass
-from typing import List, Dict, Any
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Iterable, List, Dict, Any, Optional, Tuple
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class UserInterest:
-    """Simple class to store user interests"""
+    """Simple class to store user interests. Strings are interned, since many users share the same interests."""
     interest: str
-    subinterests: List[str]
-    
+    subinterests: Tuple[str, ...] = ()
+    _key: Optional[Tuple[str, Tuple[str, ...]]] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if isinstance(self.interest, str):
+            object.__setattr__(self, "interest", sys.intern(self.interest))
+        subinterests = tuple(sys.intern(sub) if isinstance(sub, str) else sub for sub in self.subinterests or ())
+        object.__setattr__(self, "subinterests", subinterests)
+
+    def canonical_key(self) -> Tuple[str, Tuple[str, ...]]:
+        """Key that is identical for interests differing only in case, whitespace or subinterest order"""
+        if self._key is None:
+            normalize = lambda text: " ".join(text.split()).lower()
+            subinterests = sorted({normalize(sub) for sub in self.subinterests if sub and sub.strip()})
+            object.__setattr__(self, "_key", (normalize(self.interest or ""), tuple(subinterests)))
+        return self._key
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "interest": self.interest,
-            "subinterests": self.subinterests
+            "subinterests": list(self.subinterests)
         }
-    
+
     def __str__(self) -> str:
         return f"""
         UserInterest(
             interest={self.interest},
-            subinterests={self.subinterests}
+            subinterests={list(self.subinterests)}
         )
         """
 
-@dataclass
+
+class InterestTable:
+    """
+    Every distinct interest seen by the process, stored once and referenced by integer ID
+
+    Interests are deduplicated by canonical key, matching how summaries are already shared,
+    so a million subscriptions to a few thousand topics hold a few thousand interest objects.
+    """
+
+    def __init__(self):
+        self._ids: Dict[Tuple[str, Tuple[str, ...]], int] = {}
+        self._interests: List[UserInterest] = []
+        self._lock = threading.Lock()
+
+    def intern(self, user_interest: UserInterest) -> int:
+        """ID of the interest, adding it to the table if no equivalent interest is stored yet"""
+        key = user_interest.canonical_key()
+        interest_id = self._ids.get(key)
+        if interest_id is None:
+            with self._lock:
+                interest_id = self._ids.get(key)
+                if interest_id is None:
+                    interest_id = len(self._interests)
+                    self._interests.append(user_interest)
+                    self._ids[key] = interest_id
+        return interest_id
+
+    def add(self, interest: str, subinterests: Optional[Iterable[str]] = None) -> int:
+        return self.intern(UserInterest(interest=interest, subinterests=tuple(subinterests or ())))
+
+    def __getitem__(self, interest_id: int) -> UserInterest:
+        return self._interests[interest_id]
+
+    def __len__(self) -> int:
+        return len(self._interests)
+
+
+# Process-wide table shared by all loaders and users
+interest_table = InterestTable()
+
+
+@dataclass(frozen=True, slots=True, init=False)
 class User:
-    """Simple class to store user interests"""
+    """Simple class to store user interests, referenced by ID in the shared interest table"""
     id: str
     email: str
-    user_interests: List[UserInterest]
\ No newline at end of file
+    interest_ids: Tuple[int, ...]
+
+    def __init__(self, id: str, email: str, user_interests: Iterable[UserInterest] = (),
+                 interest_ids: Optional[Iterable[int]] = None):
+        object.__setattr__(self, "id", id)
+        object.__setattr__(self, "email", email)
+        if interest_ids is None:
+            interest_ids = (interest_table.intern(user_interest) for user_interest in user_interests)
+        object.__setattr__(self, "interest_ids", tuple(interest_ids))
+
+    @property
+    def user_interests(self) -> List[UserInterest]:
+        return [interest_table[interest_id] for interest_id in self.interest_ids]
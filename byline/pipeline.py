@@ -0,0 +1,285 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Any, Iterable, List, Optional, Tuple
+from byline.models.user_models import User, UserInterest
+from byline.services.templates.email_template import render_email_body, render_email_subject
+from byline.services.templates.render import FragmentCache
+from byline.utils.tracing import tracer
+from byline.utils.watermarks import WatermarkStore, assemble_digest, drop_reported_papers, extract_paper_ids
+from byline.utils.work_queue import DigestQueue, SENT, FAILED
+
+if TYPE_CHECKING:
+    # Only needed for annotations; importing them would load the OpenAI and SMTP clients
+    from byline.services.email_service import EmailService
+    from byline.services.summary_agent import ExecutiveSummaryAgent
+
+
+class SummaryMemo:
+    """Generates each distinct interest summary exactly once per run and shares it with every subscriber"""
+
+    def __init__(self, agent: "ExecutiveSummaryAgent", executor: ThreadPoolExecutor):
+        self.agent = agent
+        self.executor = executor
+        self.requests = 0
+        self._futures: Dict[Any, Future] = {}
+        self._lock = threading.Lock()
+        self.fragments = FragmentCache(maxsize=100000)
+
+    def get(self, user_interest: UserInterest) -> Future:
+        """Return a future for the interest's summary, starting generation only on first request"""
+        key = user_interest.canonical_key()
+        with self._lock:
+            self.requests += 1
+            future = self._futures.get(key)
+            if future is None:
+                future = self.executor.submit(self.agent.create_executive_summary, user_interest)
+                self._futures[key] = future
+        return future
+
+    def get_digest(self, user: User) -> Future:
+        """Return a future for a single-pass digest of all the user's interests, shared by users with the same interests"""
+        key = ("digest",) + tuple(sorted(user_interest.canonical_key() for user_interest in user.user_interests))
+        with self._lock:
+            self.requests += 1
+            future = self._futures.get(key)
+            if future is None:
+                future = self.executor.submit(self.agent.create_user_digest, user)
+                self._futures[key] = future
+        return future
+
+    def fragment(self, user_interest: UserInterest) -> Tuple[str, List[str]]:
+        """
+        The interest's summary with repeated papers removed, and the papers it links to
+
+        Waits for the summary. Computed once per distinct interest and shared by every subscriber.
+        """
+        return self.fragments.get(
+            user_interest.canonical_key(),
+            lambda: drop_reported_papers(self.get(user_interest).result(), set())
+        )
+
+    @property
+    def distinct(self) -> int:
+        with self._lock:
+            return len(self._futures)
+
+    def savings(self) -> Dict[str, Any]:
+        """Estimate LLM calls and tokens saved by reusing summaries, from the average cost per generated summary"""
+        usage = self.agent.usage.to_dict()
+        distinct = self.distinct
+        reused = self.requests - distinct
+        calls_per_summary = usage["calls"] / distinct if distinct else 0
+        tokens_per_summary = (usage["input_tokens"] + usage["output_tokens"]) / distinct if distinct else 0
+        return {
+            "interest_requests": self.requests,
+            "distinct_interests": distinct,
+            "reused_summaries": reused,
+            "llm_calls_saved": round(reused * calls_per_summary),
+            "tokens_saved": round(reused * tokens_per_summary)
+        }
+
+
+def process_user(user: User, summaries: SummaryMemo, digest_queue: DigestQueue, run_date: str,
+                 watermarks: Optional[WatermarkStore] = None, single_pass: bool = False) -> bool:
+    """
+    Generate one user's digest and hand it to the delivery queue. Failures are logged and never propagate.
+
+    By default each interest is summarized separately and the summaries are joined. In single-pass
+    mode the agent writes the whole digest in one conversation.
+
+    With a watermark store, papers already reported to the user in earlier digests are left out
+    and the papers in this digest are recorded as reported.
+    """
+    try:
+        logging.info(f"Processing user: {user.email}")
+
+        if not user.user_interests:
+            logging.warning(f"User {user.email} has no interests. Skipping.")
+            return False
+
+        paper_ids = []
+        reported = set()
+        if single_pass:
+            logging.info(f"Requesting single-pass digest for {len(user.user_interests)} interests")
+            combined_summary = summaries.get_digest(user).result()
+            if watermarks is not None:
+                reported = watermarks.reported(user.id, extract_paper_ids(combined_summary))
+                combined_summary, paper_ids = drop_reported_papers(combined_summary, reported)
+        else:
+            futures = []
+            for user_interest in user.user_interests:
+                logging.info(f"Requesting executive summary for interest: {user_interest.interest}")
+                futures.append(summaries.get(user_interest))
+
+            if watermarks is not None:
+                # Assembled from per-interest fragments filtered once per run, rather than re-parsed per user
+                fragments = [summaries.fragment(user_interest) for user_interest in user.user_interests]
+                reported = watermarks.reported(user.id, {paper for _, ids in fragments for paper in ids})
+                combined_summary, paper_ids = assemble_digest(fragments, reported)
+            else:
+                combined_summary = "\n".join(future.result() for future in futures)
+        if reported:
+            logging.info(f"Left out {len(reported)} papers already reported to {user.email}")
+
+        queued = digest_queue.put(
+            run_date,
+            user.id,
+            user.email,
+            render_email_subject(run_date),
+            render_email_body(combined_summary)
+        )
+        if queued and paper_ids:
+            watermarks.mark_reported(user.id, paper_ids, run_date)
+        logging.info(f"Queued executive summary for {user.email}")
+        return True
+
+    except Exception as e:
+        logging.error(f"Error processing user {user.email}: {e}")
+        return False
+
+
+def deliver_digests(digest_queue: DigestQueue, email_service: "EmailService", run_date: str,
+                    producers_done: Optional[threading.Event] = None, batch_size: int = 50,
+                    poll_interval: float = 1.0) -> Dict[str, int]:
+    """
+    Drain pending digests for a run and send them over the email connection pool
+
+    Args:
+        digest_queue: Queue filled by the generation stage
+        email_service: Email service used for sending
+        run_date: Run whose digests are sent
+        producers_done: Set once generation has finished. Without it, the queue is drained once.
+        batch_size: Number of digests claimed at a time
+        poll_interval: Seconds to wait for new digests while producers are still running
+
+    Returns:
+        Dictionary with the number of digests sent and failed
+    """
+    sent = failed = 0
+
+    def deliver(digest: Dict[str, Any]) -> bool:
+        ok = email_service.send_rendered(digest["email"], digest["subject"], digest["html"])
+        # Failed sends are handed to the email retry queue, so they are never re-sent from this queue
+        digest_queue.mark(run_date, digest["user_id"], SENT if ok else FAILED)
+        return ok
+
+    with ThreadPoolExecutor(max_workers=email_service.pool.size, thread_name_prefix="delivery") as executor:
+        while True:
+            # Read the flag before claiming so a digest queued just before it was set is not missed
+            finished = producers_done is None or producers_done.is_set()
+            batch = digest_queue.claim(run_date, batch_size)
+            if not batch:
+                if finished:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            for ok in executor.map(deliver, batch):
+                if ok:
+                    sent += 1
+                else:
+                    failed += 1
+
+    logging.info(f"Delivery finished: {sent} sent, {failed} failed")
+    return {"sent": sent, "failed": failed}
+
+
+def run_pipeline(users: Iterable[User], agent: "ExecutiveSummaryAgent", email_service: Optional["EmailService"],
+                 digest_queue: DigestQueue, run_date: Optional[str] = None, workers: int = 4,
+                 interest_workers: int = 4, deliver: bool = True,
+                 watermarks: Optional[WatermarkStore] = None, single_pass: bool = False) -> Dict[str, Any]:
+    """
+    Generate digests concurrently with a bounded worker pool while a separate consumer delivers them
+
+    Users that already have a digest queued for the run are skipped, so a restarted run resumes
+    where it left off.
+
+    Args:
+        users: Users to process. May be a lazy iterator, which is consumed as workers free up.
+        agent: Summary agent shared by all workers
+        email_service: Email service used to send digests. Only needed when `deliver` is set.
+        digest_queue: Durable queue between generation and delivery
+        run_date: Identifier of the run, defaults to today's date
+        workers: Number of users processed at the same time
+        interest_workers: Number of distinct interest summaries generated at the same time
+        deliver: Whether to run the delivery consumer alongside generation
+        watermarks: Optional store of papers already reported to each user
+        single_pass: Write each user's digest in one conversation instead of one per interest
+
+    Returns:
+        Dictionary with run statistics
+    """
+    run_date = run_date or datetime.now().strftime("%Y-%m-%d")
+    run_start = time.perf_counter()
+    digest_queue.recover(run_date)
+
+    def timed_process_user(user: User) -> bool:
+        with tracer.span("pipeline.user"):
+            return process_user(user, summaries, digest_queue, run_date, watermarks, single_pass)
+
+    results = []
+    skipped = 0
+    # Bound the number of queued users so a streaming source is consumed as workers free up
+    in_flight = threading.BoundedSemaphore(workers * 2)
+    producers_done = threading.Event()
+
+    def on_done(future: Future):
+        results.append(future.result())
+        in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="consumer") as consumer:
+        delivery = consumer.submit(deliver_digests, digest_queue, email_service, run_date, producers_done) if deliver else None
+
+        try:
+            with ThreadPoolExecutor(max_workers=interest_workers, thread_name_prefix="interest") as interest_executor:
+                summaries = SummaryMemo(agent, interest_executor)
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="user") as user_executor:
+                    for user in users:
+                        if digest_queue.has_digest(run_date, user.id):
+                            skipped += 1
+                            continue
+                        in_flight.acquire()
+                        user_executor.submit(timed_process_user, user).add_done_callback(on_done)
+        finally:
+            producers_done.set()
+
+        delivery_stats = delivery.result() if delivery is not None else {"sent": 0, "failed": 0}
+
+    latency = tracer.stage("pipeline.user")
+    stats = {
+        "users": len(results) + skipped,
+        "queued": sum(1 for queued in results if queued),
+        "skipped": skipped,
+        "generation_failed": sum(1 for queued in results if not queued),
+        "sent": delivery_stats["sent"],
+        "send_failed": delivery_stats["failed"],
+        "wall_time": time.perf_counter() - run_start,
+        "user_latency_mean": latency["mean"],
+        "user_latency_p95": latency["p95"],
+        "user_latency_max": latency["max"],
+        "llm_usage": agent.usage.to_dict(),
+        "dedup": summaries.savings(),
+        "fragments": summaries.fragments.stats(),
+        "paper_summaries": agent.paper_summaries.stats() if agent.paper_summaries is not None else None
+    }
+    logging.info(
+        f"Run finished in {stats['wall_time']:.1f}s: {stats['queued']} digests generated, {stats['skipped']} already queued, "
+        f"{stats['generation_failed']} failed; {stats['sent']} sent, {stats['send_failed']} send failures. "
+        f"Per-user latency mean {stats['user_latency_mean']:.1f}s, p95 {stats['user_latency_p95']:.1f}s"
+    )
+    dedup = stats["dedup"]
+    logging.info(
+        f"Interest dedup: {dedup['interest_requests']} requests served by {dedup['distinct_interests']} summaries, "
+        f"saving ~{dedup['llm_calls_saved']} LLM calls and ~{dedup['tokens_saved']} tokens"
+    )
+    paper_summaries = stats["paper_summaries"]
+    if paper_summaries is not None:
+        logging.info(
+            f"Paper summaries: {paper_summaries['requests']} papers selected across digests, "
+            f"{paper_summaries['distinct_papers']} distinct; {paper_summaries['generated']} written in "
+            f"{paper_summaries['llm_calls']} LLM calls, {paper_summaries['from_store']} reused from earlier runs"
+        )
+    return stats
@@ -0,0 +1,147 @@
+import logging
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from byline.utils.text import query_terms, tokenize
+
+
+@dataclass
+class ContextBudget:
+    """Per-interest limits on the agent loop and on what tool outputs may add to the context"""
+    max_iterations: int = 5
+    max_input_tokens: int = 60000
+    max_output_tokens: int = 4000
+    max_papers_per_search: int = 6
+    max_abstract_chars: int = 700
+    max_authors: int = 3
+    max_paper_chars: int = 8000
+    max_selected_papers: int = 4
+
+
+class AgentContext:
+    """Conversation history for one agent run that keeps tool outputs compact and tracks the token budget"""
+
+    def __init__(self, prompt: str, budget: ContextBudget, focus: str = "", since: Optional[datetime] = None):
+        """
+        Args:
+            prompt: Initial user prompt
+            budget: Limits for this conversation
+            focus: Text describing what the user cares about, used to pre-rank search results
+            since: Start of the search window from the interest watermarks, if any
+        """
+        self.messages: List[Dict[str, Any]] = [{"role": "user", "content": prompt}]
+        self.budget = budget
+        self.focus_terms: Set[str] = set(tokenize(focus))
+        self.since = since
+        self.calls: List[Dict[str, int]] = []
+        self._seen_papers: Set[str] = set()
+        # Full records of the papers shown to the model, by ID, for composing digests from its selection
+        self.papers: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def iterations(self) -> int:
+        return len(self.calls)
+
+    @property
+    def input_tokens(self) -> int:
+        return sum(call["input_tokens"] for call in self.calls)
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(call["output_tokens"] for call in self.calls)
+
+    def record_usage(self, usage):
+        """Record the token usage of one responses.create call"""
+        self.calls.append({
+            "input_tokens": getattr(usage, "input_tokens", None) or 0,
+            "output_tokens": getattr(usage, "output_tokens", None) or 0
+        })
+
+    def exhausted(self) -> bool:
+        """
+        Whether the next call has to be the final answer: it is the last call the iteration budget
+        allows, or another tool round would exceed the input token budget
+        """
+        if self.iterations + 1 >= self.budget.max_iterations:
+            return True
+        # Every call resends the whole history, so the next call costs at least as much as the last
+        last_input = self.calls[-1]["input_tokens"] if self.calls else 0
+        return self.input_tokens + last_input > self.budget.max_input_tokens
+
+    def add_function_call(self, message):
+        self.messages.append({
+            "type": "function_call",
+            "call_id": message.call_id,
+            "name": message.name,
+            "arguments": message.arguments
+        })
+
+    def add_function_output(self, call_id: str, output: Dict[str, Any]):
+        self.messages.append({
+            "call_id": call_id,
+            "type": "function_call_output",
+            "output": json.dumps(output, separators=(",", ":"))
+        })
+
+    def compact_search_results(self, search_results: Dict[str, Any], query: Optional[str] = None,
+                               ranked: bool = False) -> Dict[str, Any]:
+        """
+        Shrink arXiv search results before they enter the context
+
+        Results are re-ranked locally against the query and the user's interests (unless they
+        arrive already ranked), cut to the budget's paper count, stripped of fields the model
+        does not need, and abstracts are truncated. Papers already shown earlier in the
+        conversation are only referenced by ID.
+        """
+        if "error" in search_results:
+            return {"error": search_results["error"], "results": []}
+
+        terms = self.focus_terms | set(query_terms(query or ""))
+
+        def score(paper: Dict[str, Any]) -> int:
+            text = f"{paper.get('title', '')} {paper.get('summary', '')}"
+            return len(terms & set(tokenize(text)))
+
+        papers = search_results.get("results", [])
+        if not ranked:
+            papers = sorted(papers, key=score, reverse=True)
+        compact, repeated = [], []
+        for paper in papers:
+            if len(compact) >= self.budget.max_papers_per_search:
+                break
+            if paper["id"] in self._seen_papers:
+                repeated.append(paper["id"])
+                continue
+            self._seen_papers.add(paper["id"])
+            self.papers[paper["id"]] = paper
+
+            abstract = " ".join(paper.get("summary", "").split())
+            if len(abstract) > self.budget.max_abstract_chars:
+                abstract = abstract[:self.budget.max_abstract_chars].rsplit(" ", 1)[0] + "..."
+            authors = paper.get("authors", [])
+            compact.append({
+                "id": paper["id"],
+                "title": " ".join(paper.get("title", "").split()),
+                "authors": authors[:self.budget.max_authors] + (["et al."] if len(authors) > self.budget.max_authors else []),
+                "published": paper.get("published", "")[:10],
+                "summary": abstract
+            })
+
+        result = {"results": compact, "total_found": search_results.get("total_found", len(compact))}
+        if repeated:
+            result["already_shown"] = repeated
+        return result
+
+    def compact_paper_text(self, paper: Dict[str, Any]) -> Dict[str, Any]:
+        """Cut full paper text to the budget before it enters the context"""
+        text = paper.get("text")
+        if text is None or len(text) <= self.budget.max_paper_chars:
+            return paper
+        return {**paper, "text": text[:self.budget.max_paper_chars].rsplit(" ", 1)[0] + "...", "truncated": True}
+
+    def log_usage(self, label: str):
+        logging.info(
+            f"Agent run for {label}: {self.iterations} calls, {self.input_tokens} input tokens, "
+            f"{self.output_tokens} output tokens (per call: {self.calls})"
+        )
@@ -0,0 +1,177 @@
+import logging
+import json
+import os
+import arxiv
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta
+from .arxiv_tools import format_arxiv_result
+from byline.utils.http_client import ArxivApiClient
+from byline.utils.text import query_terms, tokenize
+from byline.utils.tracing import tracer
+
+# Categories harvested when none are configured. User interests are free text,
+# so the harvest casts a wide net over the areas our users subscribe to.
+DEFAULT_CATEGORIES = [
+    "cs.AI", "cs.CL", "cs.CV", "cs.LG", "cs.MA", "cs.RO", "cs.IR", "cs.CR",
+    "cs.DC", "cs.HC", "cs.SE", "stat.ML", "quant-ph"
+]
+
+
+class PaperSnapshot:
+    """Local snapshot of harvested arXiv papers that can answer search queries"""
+
+    def __init__(self, papers: List[Dict[str, Any]], harvested_at: Optional[str] = None, categories: Optional[List[str]] = None):
+        self.papers = papers
+        self.harvested_at = harvested_at
+        self.categories = categories or []
+        self._paper_tokens = [set(tokenize(self._paper_text(paper))) for paper in papers]
+
+    @staticmethod
+    def _paper_text(paper: Dict[str, Any]) -> str:
+        return " ".join([
+            paper.get("title", ""),
+            paper.get("summary", ""),
+            " ".join(paper.get("categories", [])),
+            " ".join(paper.get("authors", []))
+        ])
+
+    def search(self, query: str, start_date: datetime, end_date: datetime, max_results: int = 10) -> List[Dict[str, Any]]:
+        """
+        Search the snapshot for papers matching the query, if it was harvested within the time window
+
+        The snapshot already holds only the papers new since the previous harvest, so papers are
+        not filtered again by submission date, which would drop papers announced late.
+
+        Args:
+            query: Free-text or arXiv-style query string
+            start_date: Earliest harvest time to include
+            end_date: Latest harvest time to include
+            max_results: Maximum number of results to return
+
+        Returns:
+            List of paper dictionaries, best matches first
+        """
+        if self.harvested_at and not start_date.isoformat() <= self.harvested_at <= end_date.isoformat():
+            return []
+        terms = set(query_terms(query))
+
+        scored = []
+        for paper, tokens in zip(self.papers, self._paper_tokens):
+            published = paper.get("published", "")[:10]
+            score = len(terms & tokens) if terms else 1
+            if score > 0:
+                scored.append((score, published, paper))
+
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [paper for _, _, paper in scored[:max_results]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "harvested_at": self.harvested_at,
+            "categories": self.categories,
+            "papers": self.papers
+        }
+
+    @classmethod
+    def load(cls, path: str) -> "PaperSnapshot":
+        with open(path, "r") as f:
+            data = json.load(f)
+        return cls(data.get("papers", []), data.get("harvested_at"), data.get("categories"))
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+
+class ArxivHarvester:
+    """Pulls all new arXiv submissions for a set of categories once per day"""
+
+    def __init__(self, snapshot_dir: str = "data/snapshots", page_size: int = 500, watermarks=None, overlap_days: int = 3):
+        """
+        Args:
+            snapshot_dir: Directory holding one snapshot file per day
+            page_size: Number of results per arXiv API request
+            watermarks: Optional WatermarkStore. When set, each harvest starts at the newest paper
+                seen by the previous run instead of a fixed number of days back.
+            overlap_days: Days the window reaches back before the watermark. Papers are dated by
+                submission but only appear once announced, so late arrivals are caught by the overlap.
+        """
+        self.snapshot_dir = snapshot_dir
+        self.client = ArxivApiClient(page_size=page_size)
+        self.watermarks = watermarks
+        self.overlap_days = overlap_days
+        logging.info(f"ArxivHarvester initialized with snapshot_dir: {snapshot_dir}")
+
+    def snapshot_path(self, date: Optional[datetime] = None) -> str:
+        date = date or datetime.now()
+        return os.path.join(self.snapshot_dir, f"arxiv_{date.strftime('%Y%m%d')}.json")
+
+    def harvest(self, categories: List[str], days_back: int = 1, max_results: int = 10000) -> PaperSnapshot:
+        """
+        Fetch every submission in the given categories within the time window
+
+        With a watermark store, the window starts `overlap_days` before the previous run's newest
+        paper and papers fetched by earlier runs are dropped; `days_back` then only applies to the
+        very first harvest.
+
+        Args:
+            categories: arXiv category identifiers, e.g. "cs.AI"
+            days_back: Number of days to harvest back from today
+            max_results: Upper bound on the number of papers fetched
+
+        Returns:
+            PaperSnapshot with the harvested papers
+        """
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days_back)
+        scope = ",".join(sorted(categories))
+        if self.watermarks is not None:
+            previous = self.watermarks.get("arxiv", scope)
+            start_date = self.watermarks.window_start("arxiv", scope, end_date.strftime("%Y-%m-%d"), start_date)
+            if previous is not None and previous["published"]:
+                start_date = start_date.replace(tzinfo=None) - timedelta(days=self.overlap_days)
+        category_query = " OR ".join(f"cat:{category}" for category in categories)
+        date_query = f"submittedDate:[{start_date.strftime('%Y%m%d')}* TO {end_date.strftime('%Y%m%d')}*]"
+        full_query = f"({category_query}) AND {date_query}"
+
+        logging.info(f"Harvesting arXiv with query: '{full_query}'")
+        search = arxiv.Search(
+            query=full_query,
+            max_results=max_results,
+            sort_by=arxiv.SortCriterion.SubmittedDate
+        )
+        with tracer.span("arxiv.harvest"):
+            papers = [format_arxiv_result(result) for result in self.client.results(search)]
+
+        if self.watermarks is not None:
+            source = f"arxiv:{scope}"
+            papers = self.watermarks.unseen(source, papers)
+            self.watermarks.mark_seen(source, papers, before=start_date - timedelta(days=self.overlap_days))
+            if papers:
+                newest = max(papers, key=lambda paper: paper["published"])
+                self.watermarks.advance("arxiv", scope, newest["published"], newest["id"])
+
+        tracer.incr("arxiv.harvested_papers", len(papers))
+        logging.info(f"Harvested {len(papers)} papers across {len(categories)} categories since {start_date.isoformat()}")
+
+        return PaperSnapshot(papers, end_date.isoformat(), list(categories))
+
+    def load_or_harvest(self, categories: List[str], days_back: int = 1) -> PaperSnapshot:
+        """Load today's snapshot if it exists, otherwise harvest and persist a new one"""
+        path = self.snapshot_path()
+        if os.path.exists(path):
+            snapshot = PaperSnapshot.load(path)
+            if set(categories) <= set(snapshot.categories):
+                logging.info(f"Loaded existing arXiv snapshot from {path}")
+                return snapshot
+            logging.info(f"Existing snapshot at {path} does not cover all categories. Re-harvesting.")
+
+        snapshot = self.harvest(categories, days_back)
+        snapshot.save(path)
+        logging.info(f"Saved arXiv snapshot to {path}")
+        return snapshot
@@ -1,21 +1,41 @@
 import logging
 import arxiv
-import tempfile
-import os
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-import PyPDF2
-import io
-import requests
+from byline.utils.http_client import ArxivApiClient
+from byline.utils.tracing import tracer
+
+def format_arxiv_result(result: arxiv.Result) -> Dict[str, Any]:
+    """Convert an arxiv.Result into the dictionary shape returned by the search tool"""
+    return {
+        "id": result.entry_id,
+        "title": result.title,
+        "authors": [str(author) for author in result.authors],
+        "summary": result.summary,
+        "published": result.published.isoformat(),
+        "updated": result.updated.isoformat(),
+        "categories": result.categories,
+        "pdf_url": result.pdf_url,
+        "primary_category": result.primary_category
+    }
 
 class ArxivTools:
-    """Tools for searching and downloading papers from arXiv"""
+    """Tools for searching papers on arXiv"""
     
-    def __init__(self):
-        self.client = arxiv.Client()
-        logging.info("ArxivTools initialized")
+    def __init__(self, paper_store=None, cache=None):
+        """
+        Args:
+            paper_store: Optional local PaperIndex or PaperSnapshot built from the daily
+                harvest. When set, searches are answered locally instead of hitting the arXiv API.
+            cache: Optional DiskCache for live arXiv search results
+        """
+        self.client = ArxivApiClient()
+        self.paper_store = paper_store
+        self.cache = cache
+        logging.info(f"ArxivTools initialized (local store: {type(paper_store).__name__ if paper_store is not None else 'none'})")
     
-    def search_papers_by_time_interval(self, query: str, days_back: int = 1, max_results: int = 10) -> Dict[str, Any]:
+    def search_papers_by_time_interval(self, query: str, days_back: int = 1, max_results: int = 10,
+                                       since: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Search for papers within a specified time interval
         
@@ -23,6 +43,7 @@ class ArxivTools:
             query: Search query string
             days_back: Number of days to search back from today
             max_results: Maximum number of results to return
+            since: Start of the window from a persisted watermark. Overrides `days_back` when set.
             
         Returns:
             Dictionary containing search results
@@ -32,12 +53,23 @@ class ArxivTools:
         try:
             # Create date range query
             end_date = datetime.now()
-            start_date = end_date - timedelta(days=days_back)
+            start_date = since or end_date - timedelta(days=days_back)
             
             # Format dates for arXiv API (YYYYMMDD format)
             start_date_str = start_date.strftime("%Y%m%d")
             end_date_str = end_date.strftime("%Y%m%d")
             
+            if self.paper_store is not None:
+                with tracer.span("arxiv.local_search"):
+                    formatted_results = self.paper_store.search(query, start_date, end_date, max_results)
+                logging.info(f"Found {len(formatted_results)} papers in local store")
+                return {
+                    "results": formatted_results,
+                    "total_found": len(formatted_results),
+                    "search_query": query,
+                    "date_range": f"{start_date_str} to {end_date_str}"
+                }
+            
             # Construct search query with date range
             date_query = f"submittedDate:[{start_date_str}* TO {end_date_str}*]"
             if query:
@@ -45,6 +77,15 @@ class ArxivTools:
             else:
                 full_query = date_query
             
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.make_key("arxiv", full_query, max_results)
+                cached = self.cache.get(cache_key, namespace="arxiv")
+                if cached is not None:
+                    tracer.incr("arxiv.cache_hits")
+                    logging.info(f"Found {cached['total_found']} papers in cache")
+                    return cached
+            
             # Create search
             search = arxiv.Search(
                 query=full_query,
@@ -53,32 +94,25 @@ class ArxivTools:
             )
             
             # Execute search
-            results = list(self.client.results(search))
+            with tracer.span("arxiv.search"):
+                results = list(self.client.results(search))
             
             # Format results
-            formatted_results = []
-            for result in results:
-                formatted_results.append({
-                    "id": result.entry_id,
-                    "title": result.title,
-                    "authors": [str(author) for author in result.authors],
-                    "summary": result.summary,
-                    "published": result.published.isoformat(),
-                    "updated": result.updated.isoformat(),
-                    "categories": result.categories,
-                    "pdf_url": result.pdf_url,
-                    "primary_category": result.primary_category
-                })
+            formatted_results = [format_arxiv_result(result) for result in results]
             
             logging.info(f"Found {len(formatted_results)} papers")
-            return {
+            search_results = {
                 "results": formatted_results,
                 "total_found": len(formatted_results),
                 "search_query": full_query,
                 "date_range": f"{start_date_str} to {end_date_str}"
             }
+            if cache_key is not None:
+                self.cache.set(cache_key, search_results, namespace="arxiv")
+            return search_results
             
         except Exception as e:
+            tracer.incr("arxiv.errors")
             logging.error(f"Error searching arXiv: {str(e)}")
             return {
                 "error": str(e),
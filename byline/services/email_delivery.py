@@ -0,0 +1,149 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+import yagmail
+
+
+class SMTPConnectionPool:
+    """Small pool of reusable SMTP connections that are opened lazily and replaced when they break"""
+
+    def __init__(self, factory: Callable[[], yagmail.SMTP], size: int = 4):
+        """
+        Args:
+            factory: Creates a new, not yet connected, yagmail.SMTP client
+            size: Maximum number of open connections
+        """
+        self.factory = factory
+        self.size = size
+        self._idle: "queue.LifoQueue[yagmail.SMTP]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._all: List[yagmail.SMTP] = []
+        self.reconnects = 0
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connected client for the duration of the block"""
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self.factory()
+                with self._lock:
+                    self._all.append(conn)
+            try:
+                if conn.smtp is None or conn.is_closed:
+                    conn.login()
+                yield conn
+            except Exception:
+                self._discard(conn)
+                raise
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def _discard(self, conn: yagmail.SMTP):
+        conn.close()
+        with self._lock:
+            if conn in self._all:
+                self._all.remove(conn)
+
+    def reconnect(self, conn: yagmail.SMTP):
+        """Drop a broken connection's socket and log in again"""
+        conn.close()
+        conn.login()
+        with self._lock:
+            self.reconnects += 1
+
+    def close(self):
+        with self._lock:
+            connections, self._all = self._all, []
+        for conn in connections:
+            conn.close()
+        self._idle = queue.LifoQueue()
+
+
+class RetryQueue:
+    """Persistent queue of failed sends that are retried with exponential backoff on later attempts"""
+
+    def __init__(self, db_path: str = "data/email_retry.db", max_attempts: int = 5, base_delay: float = 300):
+        """
+        Args:
+            db_path: Location of the SQLite queue file
+            max_attempts: Sends that fail this many times are dropped and logged
+            base_delay: Seconds to wait before the first retry, doubled on every failure
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS pending_emails (
+                    id INTEGER PRIMARY KEY,
+                    recipient TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    html TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 1,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    def enqueue(self, recipient: str, subject: str, html: str, error: str):
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO pending_emails (recipient, subject, html, next_attempt_at, last_error, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (recipient, subject, html, now + self.base_delay, error, now)
+            )
+        logging.info(f"Queued email to {recipient} for retry")
+
+    def due(self, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Return queued sends whose backoff has elapsed"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, recipient, subject, html, attempts FROM pending_emails WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+        return [
+            {"id": row[0], "recipient": row[1], "subject": row[2], "html": row[3], "attempts": row[4]}
+            for row in rows
+        ]
+
+    def mark_sent(self, entry_id: int):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM pending_emails WHERE id = ?", (entry_id,))
+
+    def mark_failed(self, entry_id: int, error: str):
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT recipient, attempts FROM pending_emails WHERE id = ?", (entry_id,)).fetchone()
+            if row is None:
+                return
+            recipient, attempts = row[0], row[1] + 1
+            if attempts >= self.max_attempts:
+                self.conn.execute("DELETE FROM pending_emails WHERE id = ?", (entry_id,))
+                logging.error(f"Giving up on email to {recipient} after {attempts} attempts: {error}")
+                return
+            self.conn.execute(
+                "UPDATE pending_emails SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (attempts, time.time() + self.base_delay * 2 ** (attempts - 1), error, entry_id)
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pending_emails").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -1,65 +1,128 @@
 import yagmail
 import logging
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Any, Iterable, Optional, Tuple
 from byline.models.user_models import User
+from byline.services.email_delivery import SMTPConnectionPool, RetryQueue
+from byline.services.templates.email_template import render_email_body, render_email_subject
+from byline.utils.concurrency import service_limits, TokenBucket
+from byline.utils.tracing import tracer
 
 class EmailService:
     """Service to send executive summary reports via email"""
-    
-    def __init__(self, sender_email: str, sender_password: str):
+
+    def __init__(self, sender_email: str, sender_password: str, pool_size: int = 2, rate_limit: Optional[float] = None,
+                 retry_queue: Optional[RetryQueue] = None, **smtp_options: Any):
+        """
+        Args:
+            sender_email: Address the summaries are sent from
+            sender_password: SMTP password for the sender
+            pool_size: Number of SMTP connections kept open for parallel sends
+            rate_limit: Maximum messages per second across all connections, or None for no limit
+            retry_queue: Persistent queue for sends that fail, or None to only log failures
+            smtp_options: Extra yagmail.SMTP options, e.g. host/port for a local test server
+        """
         self.sender_email = sender_email
         self.sender_password = sender_password
-        self.yag = yagmail.SMTP(sender_email, sender_password)
-        logging.info(f"EmailService initialized with sender: {sender_email}")
-    
+        # Never let a hung SMTP socket stall a worker indefinitely
+        smtp_options.setdefault("timeout", 60)
+        self.pool = SMTPConnectionPool(
+            lambda: yagmail.SMTP(sender_email, sender_password, **smtp_options),
+            size=pool_size
+        )
+        self.rate_limiter = TokenBucket(rate_limit, burst=pool_size) if rate_limit else None
+        self.retry_queue = retry_queue
+        logging.info(f"EmailService initialized with sender: {sender_email}, pool size: {pool_size}")
+
+    def _deliver(self, recipient: str, subject: str, html_content: str):
+        """Send one message over a pooled connection, reconnecting once if the connection dropped"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        with service_limits.limit("smtp"), tracer.span("email.send"), self.pool.connection() as yag:
+            recipients, message = yag.prepare_send(to=recipient, subject=subject, contents=html_content)
+            try:
+                yag.smtp.sendmail(yag.user, recipients, message)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPSenderRefused, ConnectionError) as e:
+                logging.warning(f"SMTP connection lost while sending to {recipient}, reconnecting: {e}")
+                tracer.incr("email.reconnects")
+                self.pool.reconnect(yag)
+                yag.smtp.sendmail(yag.user, recipients, message)
+        tracer.incr("email.sent")
+        tracer.incr("email.bytes", len(message))
+
     def send_executive_summary(self, user: User, summary: str) -> bool:
         """Send executive summary report to user"""
+        subject = self.generate_email_subject()
+        html_content = self.generate_email_content(summary)
+        return self.send_rendered(user.email, subject, html_content)
+
+    def send_rendered(self, recipient: str, subject: str, html_content: str) -> bool:
+        """Send an already rendered email, queueing it for a later retry if it fails"""
         try:
-            logging.info(f"Sending executive summary to user: {user.email}")
-            
-            subject = self.generate_email_subject()
-            
-            html_content = self.generate_email_content(summary)
-            
-            # Send email
-            self.yag.send(
-                to=user.email,
-                subject=subject,
-                contents=html_content
-            )
-            
-            logging.info(f"Executive summary email sent successfully to {user.email}")
+            logging.info(f"Sending executive summary to user: {recipient}")
+
+            self._deliver(recipient, subject, html_content)
+
+            logging.info(f"Executive summary email sent successfully to {recipient}")
             return True
-            
+
         except Exception as e:
-            error_msg = f"Failed to send email to {user.email}: {str(e)}"
+            error_msg = f"Failed to send email to {recipient}: {str(e)}"
             logging.error(error_msg)
+            tracer.incr("email.failed")
+            if self.retry_queue is not None:
+                self.retry_queue.enqueue(recipient, subject, html_content, str(e))
             return False
-    
+
+    def send_many(self, digests: Iterable[Tuple[User, str]], workers: Optional[int] = None) -> int:
+        """Send many summaries in parallel over the connection pool. Returns the number sent."""
+        with ThreadPoolExecutor(max_workers=workers or self.pool.size, thread_name_prefix="smtp") as executor:
+            results = list(executor.map(lambda digest: self.send_executive_summary(*digest), digests))
+        return sum(1 for sent in results if sent)
+
+    def retry_failed(self) -> Tuple[int, int]:
+        """Retry queued sends whose backoff has elapsed. Returns (sent, still failing)."""
+        if self.retry_queue is None:
+            return 0, 0
+
+        entries = self.retry_queue.due()
+        if entries:
+            logging.info(f"Retrying {len(entries)} previously failed emails")
+
+        def retry(entry) -> bool:
+            tracer.incr("email.retries")
+            try:
+                self._deliver(entry["recipient"], entry["subject"], entry["html"])
+                self.retry_queue.mark_sent(entry["id"])
+                logging.info(f"Retried email to {entry['recipient']} sent successfully")
+                return True
+            except Exception as e:
+                logging.error(f"Retry of email to {entry['recipient']} failed: {e}")
+                self.retry_queue.mark_failed(entry["id"], str(e))
+                return False
+
+        with ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix="smtp-retry") as executor:
+            results = list(executor.map(retry, entries))
+        sent = sum(1 for ok in results if ok)
+        return sent, len(results) - sent
+
     def close(self):
-        """Close the email connection"""
+        """Close the email connections"""
         try:
-            self.yag.close()
-            logging.info("Email connection closed")
+            self.pool.close()
+            logging.info("Email connections closed")
         except Exception as e:
             logging.error(f"Error closing email connection: {e}")
 
-    def generate_email_subject(self) -> str:
-        """Generate email subject"""
-        return f"[Byline Update] | {datetime.now().strftime('%Y-%m-%d')}"
-    
+    def generate_email_subject(self, run_date: Optional[str] = None) -> str:
+        """Generate email subject for a run date (YYYY-MM-DD), today by default"""
+        return render_email_subject(run_date or datetime.now().strftime('%Y-%m-%d'))
+
     def generate_email_content(self, summary: str) -> str:
         """Generate email content"""
-        return f"""
-        <html>
-        <body>
-            <h2>Research Summary</h2>
-            <hr/>
-            <div style="white-space: pre-wrap; font-family: Arial, sans-serif;">
-            {summary}
-            </div>
-        </body>
-        </html>
-        """
+        return render_email_body(summary)
 
 
@@ -1,13 +1,14 @@
-import requests
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from byline.utils.http_client import exa_http
 
 class ExaSearch:
     """Simple class to interact with Exa search API"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, watermarks=None):
         self.api_key = api_key
+        self.watermarks = watermarks
         self.base_url = "https://api.exa.ai/search"
         self.headers = {
             "x-api-key": api_key,
@@ -15,8 +16,13 @@ class ExaSearch:
         }
         logging.info(f"ExaSearch initialized with API key: {api_key[:8]}...")
     
-    def search(self, query: str, num_results: int = 10, text: bool = True) -> Dict[str, Any]:
-        """Search using Exa API"""
+    def search(self, query: str, num_results: int = 10, text: bool = True, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Search using Exa API
+        
+        The window starts at `since` when given, otherwise at the query's watermark when a
+        WatermarkStore is configured, and falls back to the last day.
+        """
         logging.info(f"ExaSearch.search called with query: '{query}', num_results: {num_results}")
         
         payload = {
@@ -25,12 +31,16 @@ class ExaSearch:
             "text": text
         }
         
-        payload["startPublishedDate"] = (datetime.now() - timedelta(days=1)).isoformat()
-        payload["endPublishedDate"] = datetime.now().isoformat()
+        end_date = datetime.now()
+        start_date = since or end_date - timedelta(days=1)
+        if since is None and self.watermarks is not None:
+            start_date = self.watermarks.window_start("exa", query, end_date.strftime("%Y-%m-%d"), start_date)
+        payload["startPublishedDate"] = start_date.isoformat()
+        payload["endPublishedDate"] = end_date.isoformat()
         
         logging.info(f"Sending request to Exa API with payload: {payload}")
         
-        response = requests.post(
+        response = exa_http.post(
             self.base_url,
             headers=self.headers,
             json=payload
@@ -39,6 +49,11 @@ class ExaSearch:
         if response.status_code == 200:
             result = response.json()
             logging.info(f"Exa search successful, got {len(result.get('results', []))} results")
+            if since is None and self.watermarks is not None:
+                published = [item for item in result.get("results", []) if item.get("publishedDate")]
+                if published:
+                    newest = max(published, key=lambda item: item["publishedDate"])
+                    self.watermarks.advance("exa", query, newest["publishedDate"], newest.get("id"))
             return result
         else:
             error_msg = f"Exa search failed: {response.status_code} - {response.text}"
@@ -0,0 +1,114 @@
+import logging
+import io
+import json
+import time
+from typing import Any, Dict
+from byline.utils.tracing import tracer
+
+BATCH_ENDPOINT = "/v1/responses"
+_DONE_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def response_text(body: Dict[str, Any]) -> str:
+    """Text of a Responses API result given as JSON, the equivalent of the SDK's `output_text`"""
+    return "".join(
+        content.get("text", "")
+        for item in body.get("output", [])
+        if item.get("type") == "message"
+        for content in item.get("content", [])
+        if content.get("type") == "output_text"
+    )
+
+
+class BatchRunner:
+    """
+    Runs Responses API requests through the OpenAI Batch API
+
+    All requests go up as one JSONL file in a single batch, which is polled until it finishes.
+    Batches cost half as much as interactive calls and have their own rate limits, at the price of
+    finishing within hours rather than seconds, which suits work that is not latency-critical.
+    """
+
+    def __init__(self, client, poll_interval: float = 60.0, timeout: float = 4 * 3600, completion_window: str = "24h"):
+        """
+        Args:
+            client: OpenAI client
+            poll_interval: Seconds between status checks
+            timeout: Seconds to wait for the batch before cancelling it. The default leaves two hours of
+                a GitHub Actions job's six-hour limit to summarize the rest interactively and deliver
+            completion_window: Completion window requested from the Batch API
+        """
+        self.client = client
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.completion_window = completion_window
+
+    def run(self, requests: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Submit requests and wait for their results
+
+        Args:
+            requests: Responses API request bodies by custom ID
+
+        Returns:
+            Response bodies of the requests that succeeded, by custom ID. Failed requests, and all
+            requests of a batch that fails or times out, are left out so callers can fall back
+            to interactive calls.
+        """
+        if not requests:
+            return {}
+
+        lines = "".join(
+            json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}) + "\n"
+            for custom_id, body in requests.items()
+        )
+        with tracer.span("openai_batch.submit"):
+            input_file = self.client.files.create(file=("byline_batch.jsonl", io.BytesIO(lines.encode("utf-8"))), purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window=self.completion_window
+            )
+        tracer.incr("openai_batch.requests", len(requests))
+        logging.info(f"Submitted batch {batch.id} with {len(requests)} requests")
+
+        batch = self._wait(batch)
+        if batch.status != "completed":
+            logging.error(f"Batch {batch.id} ended with status {batch.status}")
+            tracer.incr("openai_batch.failed", len(requests))
+            return {}
+
+        results = {}
+        if batch.output_file_id:
+            for line in self.client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                if record.get("error") is None and response.get("status_code") == 200:
+                    results[record["custom_id"]] = response["body"]
+        failed = len(requests) - len(results)
+        if failed:
+            logging.warning(f"{failed} of {len(requests)} requests in batch {batch.id} failed")
+        tracer.incr("openai_batch.succeeded", len(results))
+        tracer.incr("openai_batch.failed", failed)
+        return results
+
+    def _wait(self, batch):
+        """Poll the batch until it finishes, cancelling it once the timeout has passed"""
+        deadline = time.monotonic() + self.timeout
+        with tracer.span("openai_batch.wait"):
+            while batch.status not in _DONE_STATUSES:
+                if time.monotonic() >= deadline:
+                    logging.error(f"Batch {batch.id} did not finish within {self.timeout:.0f}s, cancelling it")
+                    try:
+                        self.client.batches.cancel(batch.id)
+                    except Exception as e:
+                        logging.warning(f"Cancelling batch {batch.id} failed: {e}")
+                    return batch
+                time.sleep(self.poll_interval)
+                batch = self.client.batches.retrieve(batch.id)
+                counts = getattr(batch, "request_counts", None)
+                if counts is not None:
+                    logging.info(f"Batch {batch.id} {batch.status}: {counts.completed}/{counts.total} done, {counts.failed} failed")
+        return batch
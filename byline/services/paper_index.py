@@ -0,0 +1,191 @@
+import logging
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+from byline.utils.text import query_terms
+
+# BM25 column weights for (title, summary, categories, authors)
+BM25_WEIGHTS = (5.0, 1.0, 2.0, 1.0)
+
+
+class PaperIndex:
+    """On-disk BM25 full-text index over harvested arXiv paper metadata, backed by SQLite FTS5"""
+
+    def __init__(self, db_path: str = "data/index/papers.db", read_only: bool = False):
+        """
+        Args:
+            db_path: Location of the SQLite index, or ":memory:" for a private in-memory index
+            read_only: Open an existing index for searching only, e.g. one built by a separate harvest job
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._create_tables()
+        logging.info(f"PaperIndex initialized at {db_path} with {len(self)} papers")
+
+    def _create_tables(self):
+        with self._lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS papers (
+                    rowid INTEGER PRIMARY KEY,
+                    arxiv_id TEXT UNIQUE NOT NULL,
+                    published TEXT NOT NULL,
+                    updated TEXT,
+                    data TEXT NOT NULL,
+                    first_seen TEXT
+                )
+            """)
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(papers)")}
+            if "first_seen" not in columns:
+                # Indexes built before first_seen was tracked treat papers as seen when they were published
+                self.conn.execute("ALTER TABLE papers ADD COLUMN first_seen TEXT")
+                self.conn.execute("UPDATE papers SET first_seen = published")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS papers_published ON papers(published)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS papers_first_seen ON papers(first_seen)")
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                    title, summary, categories, authors,
+                    tokenize = 'porter unicode61'
+                )
+            """)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def add_papers(self, papers: List[Dict[str, Any]], seen_at: Optional[str] = None) -> int:
+        """
+        Incrementally add harvested papers to the index
+
+        Papers already present are skipped unless their `updated` timestamp changed, and keep the
+        time they were first seen.
+
+        Args:
+            papers: Paper dictionaries in the search tool's result shape
+            seen_at: ISO timestamp of the harvest the papers come from, defaults to now
+
+        Returns:
+            Number of papers inserted or refreshed
+        """
+        seen_at = seen_at or datetime.now().isoformat()
+        changed = 0
+        with self._lock, self.conn:
+            for paper in papers:
+                row = self.conn.execute(
+                    "SELECT rowid, updated FROM papers WHERE arxiv_id = ?", (paper["id"],)
+                ).fetchone()
+                if row is not None and row[1] == paper.get("updated"):
+                    continue
+
+                if row is None:
+                    cursor = self.conn.execute(
+                        "INSERT INTO papers (arxiv_id, published, updated, data, first_seen) VALUES (?, ?, ?, ?, ?)",
+                        (paper["id"], paper.get("published", ""), paper.get("updated"), json.dumps(paper), seen_at)
+                    )
+                    rowid = cursor.lastrowid
+                else:
+                    rowid = row[0]
+                    self.conn.execute(
+                        "UPDATE papers SET published = ?, updated = ?, data = ? WHERE rowid = ?",
+                        (paper.get("published", ""), paper.get("updated"), json.dumps(paper), rowid)
+                    )
+                    self.conn.execute("DELETE FROM papers_fts WHERE rowid = ?", (rowid,))
+
+                self.conn.execute(
+                    "INSERT INTO papers_fts (rowid, title, summary, categories, authors) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        rowid,
+                        paper.get("title", ""),
+                        paper.get("summary", ""),
+                        " ".join(paper.get("categories", [])),
+                        " ".join(paper.get("authors", []))
+                    )
+                )
+                changed += 1
+
+        logging.info(f"PaperIndex refreshed: {changed} of {len(papers)} papers inserted or updated")
+        return changed
+
+    def prune(self, before: datetime) -> int:
+        """Remove papers first seen before the given date, which no search window reaches any more"""
+        cutoff = before.strftime("%Y-%m-%d")
+        with self._lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM papers_fts WHERE rowid IN (SELECT rowid FROM papers WHERE first_seen < ?)", (cutoff,)
+            )
+            removed = self.conn.execute("DELETE FROM papers WHERE first_seen < ?", (cutoff,)).rowcount
+        logging.info(f"PaperIndex pruned {removed} papers first seen before {cutoff}")
+        return removed
+
+    @staticmethod
+    def _match_expression(query: str) -> str:
+        terms = dict.fromkeys(query_terms(query))
+        return " OR ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+    def search(self, query: str, start_date: datetime, end_date: datetime, max_results: int = 10) -> List[Dict[str, Any]]:
+        """
+        Search the index with BM25 ranking among papers first seen within a time window
+
+        The window applies to when a paper was harvested, not when it was submitted: a paper
+        submitted days ago but only announced since the last run is still new to the reader.
+
+        Args:
+            query: Free-text or arXiv-style query string
+            start_date: Earliest harvest time to include
+            end_date: Latest harvest time to include
+            max_results: Maximum number of results to return
+
+        Returns:
+            List of paper dictionaries, best matches first
+        """
+        start = start_date.isoformat()
+        end = end_date.isoformat()
+        match = self._match_expression(query)
+
+        with self._lock:
+            if match:
+                # Papers are inserted as they are harvested, so a window's papers occupy a narrow rowid
+                # range. Bounding the full-text match by it lets FTS5 skip the doclists of older days
+                # instead of scoring every match in the index and discarding most of them afterwards.
+                first, last = self.conn.execute(
+                    "SELECT MIN(rowid), MAX(rowid) FROM papers WHERE first_seen BETWEEN ? AND ?", (start, end)
+                ).fetchone()
+                if first is None:
+                    return []
+                rows = self.conn.execute(
+                    f"""
+                    SELECT papers.data FROM papers_fts
+                    JOIN papers ON papers.rowid = papers_fts.rowid
+                    WHERE papers_fts MATCH ?
+                      AND papers_fts.rowid BETWEEN ? AND ?
+                      AND papers.first_seen BETWEEN ? AND ?
+                    ORDER BY bm25(papers_fts, {", ".join(str(w) for w in BM25_WEIGHTS)})
+                    LIMIT ?
+                    """,
+                    (match, first, last, start, end, max_results)
+                ).fetchall()
+            else:
+                rows = self.conn.execute(
+                    """
+                    SELECT data FROM papers
+                    WHERE first_seen BETWEEN ? AND ?
+                    ORDER BY published DESC
+                    LIMIT ?
+                    """,
+                    (start, end, max_results)
+                ).fetchall()
+
+        return [json.loads(row[0]) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
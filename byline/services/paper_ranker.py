@@ -0,0 +1,226 @@
+import logging
+import json
+import os
+import threading
+import zlib
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+from byline.utils.text import tokenize
+from byline.models.user_models import UserInterest
+
+# Number of hashed feature buckets. 4096 float32 columns cost 16 KB per paper on disk.
+DEFAULT_DIMENSIONS = 4096
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "our", "that", "the", "their", "these", "this", "to", "we", "which",
+    "with", "via", "using", "based", "paper", "propose", "proposed", "show", "results", "approach"
+}
+
+
+def _features(text: str) -> List[str]:
+    """Unigrams and bigrams of the non-stop-word tokens"""
+    tokens = [token for token in tokenize(text) if token not in STOP_WORDS]
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+class PaperRanker:
+    """
+    Pre-ranks harvested papers against user interests with hashed TF-IDF vectors and cosine similarity
+
+    Paper term vectors are computed once per paper and appended to a memory-mapped float32 matrix,
+    so later runs and every user reuse them. IDF weights are derived from the papers activated for
+    the current run, and interest vectors are cached by the interest's canonical key.
+    """
+
+    def __init__(self, vector_dir: str = "data/vectors", dimensions: int = DEFAULT_DIMENSIONS, read_only: bool = False):
+        """
+        Args:
+            vector_dir: Directory holding the vector matrix and its metadata
+            dimensions: Number of hashed feature buckets
+            read_only: Never write to vector_dir; papers without a stored vector are embedded in memory only
+        """
+        self.vector_dir = vector_dir
+        self.dimensions = dimensions
+        self.read_only = read_only
+        self.matrix_path = os.path.join(vector_dir, "papers.f32")
+        self.meta_path = os.path.join(vector_dir, "papers.json")
+        if not read_only:
+            os.makedirs(vector_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._interest_vectors: Dict[Tuple[str, Tuple[str, ...]], np.ndarray] = {}
+        self._papers: List[Dict[str, Any]] = []
+        self._weighted: Optional[np.ndarray] = None
+        self._idf: Optional[np.ndarray] = None
+        self._load()
+        logging.info(f"PaperRanker initialized at {vector_dir} with {len(self._ids)} paper vectors")
+
+    def _load(self):
+        meta = {}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r") as f:
+                meta = json.load(f)
+        if meta.get("dimensions") != self.dimensions:
+            # No metadata, or vectors hashed into a different number of buckets: start over
+            meta = {"dimensions": self.dimensions, "ids": [], "published": []}
+            if not self.read_only:
+                open(self.matrix_path, "wb").close()
+
+        self._ids: List[str] = meta["ids"]
+        self._published: List[str] = meta["published"]
+        self._rows: Dict[str, int] = {paper_id: row for row, paper_id in enumerate(self._ids)}
+
+        # Rows appended by a run that died before saving the metadata are dropped
+        expected_bytes = len(self._ids) * self.dimensions * 4
+        if self.read_only:
+            if self._ids and os.path.getsize(self.matrix_path) < expected_bytes:
+                raise ValueError(f"Vector matrix {self.matrix_path} is shorter than its metadata")
+        elif os.path.getsize(self.matrix_path) != expected_bytes:
+            with open(self.matrix_path, "r+b") as f:
+                f.truncate(expected_bytes)
+        self._open_matrix()
+
+    def _open_matrix(self):
+        if self._ids:
+            self.vectors = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(len(self._ids), self.dimensions))
+        else:
+            self.vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+
+    def _save_meta(self):
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dimensions": self.dimensions, "ids": self._ids, "published": self._published}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def term_vector(self, text: str) -> np.ndarray:
+        """Sublinear term-frequency vector of the text, hashed into the configured number of buckets"""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in _features(text):
+            hashed = zlib.crc32(feature.encode("utf-8"))
+            # The sign bit keeps colliding features from always adding up
+            vector[hashed % self.dimensions] += 1.0 if hashed & 0x80000000 else -1.0
+        np.copyto(vector, np.sign(vector) * np.log1p(np.abs(vector)))
+        return vector
+
+    @staticmethod
+    def _paper_text(paper: Dict[str, Any]) -> str:
+        # The title is repeated so it weighs more than any single abstract sentence
+        title = paper.get("title", "")
+        return f"{title} {title} {paper.get('summary', '')}"
+
+    def add_papers(self, papers: List[Dict[str, Any]]) -> int:
+        """
+        Embed papers not seen before and make the given papers the candidate set for ranking
+
+        Args:
+            papers: Paper dictionaries in the search tool's result shape, usually today's snapshot
+
+        Returns:
+            Number of papers newly embedded
+        """
+        with self._lock:
+            new_papers = [paper for paper in {paper["id"]: paper for paper in papers}.values() if paper["id"] not in self._rows]
+            if new_papers:
+                rows = np.vstack([self.term_vector(self._paper_text(paper)) for paper in new_papers])
+                for paper in new_papers:
+                    self._rows[paper["id"]] = len(self._ids)
+                    self._ids.append(paper["id"])
+                    self._published.append(paper.get("published", ""))
+                if self.read_only:
+                    self.vectors = np.vstack([self.vectors, rows])
+                else:
+                    with open(self.matrix_path, "ab") as f:
+                        f.write(rows.astype(np.float32).tobytes())
+                    self._save_meta()
+                    self._open_matrix()
+
+            self._activate(papers)
+
+        logging.info(f"PaperRanker refreshed: {len(new_papers)} of {len(papers)} papers embedded")
+        return len(new_papers)
+
+    def _activate(self, papers: List[Dict[str, Any]]):
+        """Build the IDF-weighted, normalized matrix of the candidate papers"""
+        self._papers = list({paper["id"]: paper for paper in papers}.values())
+        if not self._papers:
+            self._weighted = None
+            return
+
+        matrix = np.asarray(self.vectors[[self._rows[paper["id"]] for paper in self._papers]])
+        document_frequency = np.count_nonzero(matrix, axis=0)
+        self._idf = (np.log((1 + len(self._papers)) / (1 + document_frequency)) + 1).astype(np.float32)
+        weighted = matrix * self._idf
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._weighted = weighted / norms
+
+    def interest_vectors(self, user_interest: UserInterest) -> np.ndarray:
+        """
+        Term vectors for an interest: one for the interest with all its subinterests, plus one per subinterest
+
+        Vectors are cached by the interest's canonical key, so each distinct interest is embedded once.
+        """
+        key = user_interest.canonical_key()
+        with self._lock:
+            cached = self._interest_vectors.get(key)
+        if cached is not None:
+            return cached
+
+        interest, subinterests = key
+        texts = [" ".join((interest,) + subinterests)] + [f"{interest} {subinterest}" for subinterest in subinterests]
+        vectors = np.vstack([self.term_vector(text) for text in texts])
+        with self._lock:
+            self._interest_vectors[key] = vectors
+        return vectors
+
+    def rank(self, user_interest: UserInterest, top_k: int = 6) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Rank the candidate papers by cosine similarity to the interest or its closest subinterest
+
+        Args:
+            user_interest: Interest to rank papers for
+            top_k: Number of papers to return
+
+        Returns:
+            List of (paper, score) pairs, best match first, excluding papers with no overlap at all
+        """
+        weighted = self._weighted
+        if weighted is None or top_k <= 0:
+            return []
+
+        queries = self.interest_vectors(user_interest) * self._idf
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        scores = (weighted @ (queries / norms).T).max(axis=1)
+
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._papers[row], float(scores[row])) for row in top if scores[row] > 0]
+
+    def prune(self, before: datetime) -> int:
+        """Rewrite the vector matrix without papers published before the given date"""
+        cutoff = before.strftime("%Y-%m-%d")
+        with self._lock:
+            keep = [row for row, published in enumerate(self._published) if published[:10] >= cutoff]
+            removed = len(self._ids) - len(keep)
+            if removed:
+                kept_vectors = np.asarray(self.vectors[keep]) if keep else np.zeros((0, self.dimensions), dtype=np.float32)
+                self.vectors = kept_vectors
+                tmp_path = f"{self.matrix_path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(kept_vectors.astype(np.float32).tobytes())
+                os.replace(tmp_path, self.matrix_path)
+
+                self._ids = [self._ids[row] for row in keep]
+                self._published = [self._published[row] for row in keep]
+                self._rows = {paper_id: row for row, paper_id in enumerate(self._ids)}
+                self._save_meta()
+                self._open_matrix()
+
+        logging.info(f"PaperRanker pruned {removed} paper vectors published before {cutoff}")
+        return removed
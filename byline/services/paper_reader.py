@@ -0,0 +1,215 @@
+import logging
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+from byline.utils.http_client import HttpClient, arxiv_pdf_http
+from byline.utils.tracing import tracer
+
+PDF_URL_FORMAT = "https://arxiv.org/pdf/{}"
+# Downloads up to this size stay in memory; bigger PDFs spill to a temporary file
+SPOOL_MAX_BYTES = 2 * 1024 * 1024
+_ARXIV_ID = re.compile(r"(?:arxiv\.org/(?:abs|pdf)/)?([a-z\-]+(?:\.[A-Z]{2})?/\d{7}(?:v\d+)?|\d{4}\.\d{4,5}(?:v\d+)?)", re.IGNORECASE)
+
+
+def normalize_arxiv_id(paper_id: str) -> Optional[str]:
+    """Bare arXiv identifier, keeping the version if given, from an ID, abs URL or pdf URL"""
+    match = _ARXIV_ID.search((paper_id or "").strip())
+    return match.group(1) if match else None
+
+
+class PaperTextCache:
+    """
+    Content-addressed on-disk store of extracted paper text
+
+    Text blobs are stored once under their sha256 in `objects/`, and a SQLite index maps each
+    arXiv ID to its blob, so a paper read for one user is free for every other user and run.
+    """
+
+    def __init__(self, cache_dir: str = "data/papers"):
+        self.cache_dir = cache_dir
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "index.db"), check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS papers (
+                    arxiv_id TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    pages_read INTEGER NOT NULL,
+                    total_pages INTEGER NOT NULL,
+                    truncated INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "objects", digest[:2], f"{digest}.txt")
+
+    def get(self, arxiv_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT sha256, pages_read, total_pages, truncated FROM papers WHERE arxiv_id = ?", (arxiv_id,)
+            ).fetchone()
+        if row is None or not os.path.exists(self._object_path(row[0])):
+            return None
+        with open(self._object_path(row[0]), "r", encoding="utf-8") as f:
+            text = f.read()
+        return {"text": text, "pages_read": row[1], "total_pages": row[2], "truncated": bool(row[3])}
+
+    def set(self, arxiv_id: str, text: str, pages_read: int, total_pages: int, truncated: bool):
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO papers (arxiv_id, sha256, pages_read, total_pages, truncated, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (arxiv_id, digest, pages_read, total_pages, int(truncated), time.time())
+            )
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class PaperReader:
+    """Downloads arXiv PDFs over a pooled session and extracts a bounded amount of text, page by page"""
+
+    def __init__(self, cache: Optional[PaperTextCache] = None, http: Optional[HttpClient] = None,
+                 max_pages: int = 12, max_chars: int = 20000, max_download_bytes: int = 50 * 1024 * 1024,
+                 timeout: float = 60.0):
+        """
+        Args:
+            cache: Store of extracted text shared across users and runs
+            http: HTTP client to download with, defaults to the shared rate-limited arXiv PDF client
+            max_pages: Maximum number of pages extracted per paper
+            max_chars: Maximum number of characters extracted per paper
+            max_download_bytes: PDFs larger than this are rejected
+            timeout: Read timeout per request, in seconds
+        """
+        self.cache = cache
+        self.http = http or arxiv_pdf_http
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.max_download_bytes = max_download_bytes
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        logging.info(f"PaperReader initialized (max {max_pages} pages / {max_chars} characters per paper)")
+
+    def read(self, paper_id: str) -> Dict[str, Any]:
+        """
+        Return the text of a paper, from the cache when possible
+
+        Concurrent requests for the same paper share a single download.
+
+        Args:
+            paper_id: arXiv ID, abs URL or pdf URL
+
+        Returns:
+            Dictionary with the extracted text and how much of the paper it covers
+        """
+        arxiv_id = normalize_arxiv_id(paper_id)
+        if arxiv_id is None:
+            return {"error": f"Not an arXiv paper ID: {paper_id}"}
+
+        if self.cache is not None:
+            cached = self.cache.get(arxiv_id)
+            if cached is not None:
+                tracer.incr("papers.cache_hits")
+                return self._result(arxiv_id, cached)
+
+        with self._lock:
+            future = self._in_flight.get(arxiv_id)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[arxiv_id] = future
+
+        if not owner:
+            return self._result(arxiv_id, future.result())
+
+        try:
+            extracted = self._download_and_extract(arxiv_id)
+            if self.cache is not None:
+                self.cache.set(arxiv_id, **extracted)
+            future.set_result(extracted)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(arxiv_id, None)
+        return self._result(arxiv_id, extracted)
+
+    def _result(self, arxiv_id: str, extracted: Dict[str, Any]) -> Dict[str, Any]:
+        text = extracted["text"]
+        truncated = extracted["truncated"] or len(text) > self.max_chars
+        return {
+            "paper_id": arxiv_id,
+            "pages_read": extracted["pages_read"],
+            "total_pages": extracted["total_pages"],
+            "truncated": truncated,
+            "text": text[:self.max_chars]
+        }
+
+    def _download_and_extract(self, arxiv_id: str) -> Dict[str, Any]:
+        url = PDF_URL_FORMAT.format(arxiv_id)
+        logging.info(f"Downloading {url}")
+        # The PDF is spooled to disk past SPOOL_MAX_BYTES, so memory stays bounded for large papers
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as pdf_file:
+            with tracer.span("papers.download"):
+                with self.http.get(url, stream=True, timeout=(10.0, self.timeout)) as response:
+                    response.raise_for_status()
+                    declared = int(response.headers.get("Content-Length") or 0)
+                    if declared > self.max_download_bytes:
+                        raise ValueError(f"{arxiv_id} is {declared} bytes, over the {self.max_download_bytes} byte limit")
+                    downloaded = 0
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        downloaded += len(chunk)
+                        if downloaded > self.max_download_bytes:
+                            raise ValueError(f"{arxiv_id} exceeds the {self.max_download_bytes} byte limit")
+                        pdf_file.write(chunk)
+            tracer.incr("papers.downloaded_bytes", downloaded)
+
+            pdf_file.seek(0)
+            with tracer.span("papers.extract"):
+                return self._extract(pdf_file)
+
+    def _extract(self, pdf_file) -> Dict[str, Any]:
+        """Extract text one page at a time until the page or character cap is reached"""
+        # Imported on first use so runs that never read a paper do not pay for loading PyPDF2
+        import PyPDF2
+
+        reader = PyPDF2.PdfReader(pdf_file)
+        total_pages = len(reader.pages)
+        parts = []
+        chars = 0
+        pages_read = 0
+        for page in reader.pages:
+            if pages_read >= self.max_pages or chars >= self.max_chars:
+                break
+            page_text = " ".join((page.extract_text() or "").split())
+            parts.append(page_text)
+            chars += len(page_text) + 1
+            pages_read += 1
+
+        text = "\n".join(parts)
+        truncated = pages_read < total_pages or len(text) > self.max_chars
+        return {
+            "text": text[:self.max_chars],
+            "pages_read": pages_read,
+            "total_pages": total_pages,
+            "truncated": truncated
+        }
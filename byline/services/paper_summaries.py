@@ -0,0 +1,329 @@
+import logging
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from byline.services.paper_reader import normalize_arxiv_id
+from byline.services.templates.agent_prompt import generate_paper_summary_prompt
+from byline.utils.concurrency import service_limits
+from byline.utils.tracing import tracer
+
+_VERSION = re.compile(r"v(\d+)$")
+
+
+def paper_key(paper_id: str) -> Optional[Tuple[str, int]]:
+    """(versionless arXiv ID, version) of an entry ID or URL. A missing version counts as version 0."""
+    arxiv_id = normalize_arxiv_id(paper_id)
+    if arxiv_id is None:
+        return None
+    match = _VERSION.search(arxiv_id)
+    if match is None:
+        return arxiv_id, 0
+    return arxiv_id[:match.start()], int(match.group(1))
+
+
+def parse_selection(text: str, interests: List[str]) -> List[List[str]]:
+    """
+    Paper IDs the model chose for each interest, in the order of `interests`
+
+    The model answers with `{"interests": [{"interest": ..., "papers": [...]}]}`. Entries are matched
+    to interests by name, then by position. If the answer is not JSON, a lone interest gets every
+    arXiv ID mentioned in it.
+    """
+    try:
+        data = json.loads(text[text.index("{"):text.rindex("}") + 1])
+        entries = [entry for entry in data.get("interests", []) if isinstance(entry, dict)]
+    except (ValueError, AttributeError):
+        entries = []
+
+    if not entries:
+        if len(interests) == 1:
+            ids = [paper_id for paper_id in re.split(r"[\s,\"'\[\]]+", text) if normalize_arxiv_id(paper_id)]
+            return [list(dict.fromkeys(ids))]
+        return [[] for _ in interests]
+
+    normalize = lambda name: " ".join(str(name or "").split()).lower()
+    by_name = {normalize(entry.get("interest")): entry for entry in entries}
+    selections = []
+    for position, interest in enumerate(interests):
+        entry = by_name.get(normalize(interest))
+        if entry is None:
+            entry = entries[position] if position < len(entries) and len(entries) == len(interests) else {}
+        papers = entry.get("papers") or []
+        selections.append([str(paper_id) for paper_id in papers if isinstance(paper_id, (str, int))])
+    return selections
+
+
+class PaperSummaryStore:
+    """
+    Short per-paper summaries shared by every user and run, backed by SQLite
+
+    Summaries are keyed by versionless arXiv ID and version, so a revised paper is summarized again
+    while an unchanged one is written once however many digests and days it appears in.
+    """
+
+    def __init__(self, db_path: str = "data/paper_summaries.db"):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS paper_summaries (
+                    arxiv_id TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    summary TEXT NOT NULL,
+                    run_date TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (arxiv_id, version)
+                )
+            """)
+        logging.info(f"PaperSummaryStore initialized at {db_path}")
+
+    def get_many(self, keys: List[Tuple[str, int]]) -> Dict[Tuple[str, int], str]:
+        """Stored summaries for the given (arXiv ID, version) keys"""
+        found = {}
+        with self._lock:
+            for arxiv_id, version in keys:
+                row = self.conn.execute(
+                    "SELECT summary FROM paper_summaries WHERE arxiv_id = ? AND version = ?", (arxiv_id, version)
+                ).fetchone()
+                if row is not None:
+                    found[(arxiv_id, version)] = row[0]
+        return found
+
+    def set_many(self, summaries: Dict[Tuple[str, int], str], run_date: str):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO paper_summaries (arxiv_id, version, summary, run_date, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(arxiv_id, version, summary, run_date, time.time()) for (arxiv_id, version), summary in summaries.items()]
+            )
+
+    def prune(self, before: datetime) -> int:
+        """Forget summaries written before the given date"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute("DELETE FROM paper_summaries WHERE run_date < ?", (before.strftime("%Y-%m-%d"),))
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM paper_summaries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class PaperSummarizer:
+    """
+    Writes each paper's short summary once and hands it to every digest that selects the paper
+
+    Summaries come from this run's memory, then from the store, and only then from the LLM. Concurrent
+    requests for the same paper share one generation, and the papers one request has to generate are
+    summarized together in as few calls as possible.
+    """
+
+    def __init__(self, client, store: Optional[PaperSummaryStore] = None, model: str = "gpt-4.1",
+                 batch_size: int = 8, max_abstract_chars: int = 1500, max_output_tokens: int = 2000):
+        """
+        Args:
+            client: OpenAI client
+            store: Persistent store shared across runs, or None to only share summaries within the run
+            model: Model writing the summaries
+            batch_size: Maximum number of papers summarized per LLM call
+            max_abstract_chars: Abstracts are cut to this length in the prompt
+            max_output_tokens: Output token limit per LLM call
+        """
+        self.client = client
+        self.store = store
+        self.model = model
+        self.batch_size = batch_size
+        self.max_abstract_chars = max_abstract_chars
+        self.max_output_tokens = max_output_tokens
+        self._lock = threading.Lock()
+        self._summaries: Dict[Tuple[str, int], Future] = {}
+        self._counts = {"requests": 0, "from_run": 0, "from_store": 0, "generated": 0, "failed": 0,
+                        "llm_calls": 0, "input_tokens": 0, "output_tokens": 0}
+
+    def summarize(self, papers: List[Dict[str, Any]], run_date: Optional[str] = None) -> Dict[str, str]:
+        """
+        Short summary of every paper, keyed by the paper's `id`
+
+        A paper whose summary cannot be generated falls back to the start of its abstract, and is
+        tried again by the next request.
+        """
+        run_date = run_date or datetime.now().strftime("%Y-%m-%d")
+        keys = {paper["id"]: paper_key(paper["id"]) for paper in papers}
+        owned: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        with self._lock:
+            for paper in papers:
+                key = keys[paper["id"]]
+                if key is None or key in owned:
+                    continue
+                self._counts["requests"] += 1
+                if key in self._summaries:
+                    self._counts["from_run"] += 1
+                    continue
+                self._summaries[key] = Future()
+                owned[key] = paper
+
+        if owned:
+            try:
+                self._fill(owned, run_date)
+            finally:
+                # Never leave another request waiting on a paper this one failed to resolve
+                for key in owned:
+                    future = self._summaries.get(key)
+                    if future is not None and not future.done():
+                        with self._lock:
+                            self._summaries.pop(key, None)
+                        future.set_exception(RuntimeError(f"No summary generated for {owned[key]['id']}"))
+
+        results = {}
+        for paper in papers:
+            key = keys[paper["id"]]
+            try:
+                results[paper["id"]] = self._summaries[key].result() if key is not None else self._fallback(paper)
+            except Exception:
+                results[paper["id"]] = self._fallback(paper)
+        return results
+
+    def _fill(self, owned: Dict[Tuple[str, int], Dict[str, Any]], run_date: str):
+        """Resolve the futures of the papers this request owns, from the store or the LLM"""
+        stored = self.store.get_many(list(owned)) if self.store is not None else {}
+        for key, summary in stored.items():
+            self._summaries[key].set_result(summary)
+        with self._lock:
+            self._counts["from_store"] += len(stored)
+        tracer.incr("paper_summaries.from_store", len(stored))
+
+        missing = [(key, paper) for key, paper in owned.items() if key not in stored]
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            try:
+                generated = self._generate([paper for _, paper in batch])
+            except Exception as e:
+                logging.error(f"Paper summary generation failed for {len(batch)} papers: {e}")
+                generated = {}
+
+            written = {}
+            for key, paper in batch:
+                summary = generated.get(paper["id"])
+                if summary:
+                    written[key] = summary
+                    self._summaries[key].set_result(summary)
+                else:
+                    with self._lock:
+                        future = self._summaries.pop(key)
+                    future.set_exception(ValueError(f"No summary generated for {paper['id']}"))
+            if written and self.store is not None:
+                self.store.set_many(written, run_date)
+            with self._lock:
+                self._counts["generated"] += len(written)
+                self._counts["failed"] += len(batch) - len(written)
+            tracer.incr("paper_summaries.generated", len(written))
+
+    def _generate(self, papers: List[Dict[str, Any]]) -> Dict[str, str]:
+        """One LLM call summarizing a batch of papers, keyed by paper `id`"""
+        with service_limits.limit("openai"), tracer.span("openai.paper_summaries"):
+            response = self.client.responses.create(**self.request_body(papers))
+        usage = getattr(response, "usage", None)
+        self.record_usage(getattr(usage, "input_tokens", None) or 0, getattr(usage, "output_tokens", None) or 0)
+        tracer.incr("openai.calls")
+        tracer.incr("openai.input_tokens", getattr(usage, "input_tokens", None) or 0)
+        tracer.incr("openai.output_tokens", getattr(usage, "output_tokens", None) or 0)
+        return self.parse_summaries(papers, response.output_text)
+
+    def request_body(self, papers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Responses API request summarizing a batch of papers"""
+        prompt = generate_paper_summary_prompt([
+            {
+                "id": paper["id"],
+                "title": " ".join(paper.get("title", "").split()),
+                "abstract": " ".join(paper.get("summary", "").split())[:self.max_abstract_chars]
+            }
+            for paper in papers
+        ])
+        return {
+            "model": self.model,
+            "input": [{"role": "user", "content": prompt}],
+            "max_output_tokens": self.max_output_tokens
+        }
+
+    @staticmethod
+    def parse_summaries(papers: List[Dict[str, Any]], text: str) -> Dict[str, str]:
+        """Summaries by paper `id` from the model's JSON answer. Raises ValueError if it is not JSON."""
+        data = json.loads(text[text.index("{"):text.rindex("}") + 1])
+        return {paper["id"]: " ".join(str(data[paper["id"]]).split()) for paper in papers if data.get(paper["id"])}
+
+    def record_usage(self, input_tokens: int, output_tokens: int):
+        with self._lock:
+            self._counts["llm_calls"] += 1
+            self._counts["input_tokens"] += input_tokens
+            self._counts["output_tokens"] += output_tokens
+
+    def missing(self, papers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Papers with no summary in this run or in the store yet
+
+        Stored summaries found on the way are kept for the run, so they are not looked up again.
+        """
+        candidates = {}
+        with self._lock:
+            for paper in papers:
+                key = paper_key(paper["id"])
+                if key is not None and key not in self._summaries:
+                    candidates.setdefault(key, paper)
+        stored = self.store.get_many(list(candidates)) if self.store is not None else {}
+        with self._lock:
+            for key, summary in stored.items():
+                if key not in self._summaries:
+                    self._summaries[key] = Future()
+                    self._summaries[key].set_result(summary)
+                    self._counts["from_store"] += 1
+        tracer.incr("paper_summaries.from_store", len(stored))
+        return [paper for key, paper in candidates.items() if key not in stored]
+
+    def add(self, papers: List[Dict[str, Any]], summaries: Dict[str, str], run_date: Optional[str] = None) -> int:
+        """Keep summaries written outside `summarize`, e.g. by a batch job, for the run and in the store"""
+        run_date = run_date or datetime.now().strftime("%Y-%m-%d")
+        written = {}
+        with self._lock:
+            for paper in papers:
+                key = paper_key(paper["id"])
+                summary = summaries.get(paper["id"])
+                if key is None or not summary or key in self._summaries:
+                    continue
+                self._summaries[key] = Future()
+                self._summaries[key].set_result(summary)
+                written[key] = summary
+            self._counts["generated"] += len(written)
+        if written and self.store is not None:
+            self.store.set_many(written, run_date)
+        tracer.incr("paper_summaries.generated", len(written))
+        return len(written)
+
+    @staticmethod
+    def _fallback(paper: Dict[str, Any]) -> str:
+        abstract = " ".join(paper.get("summary", "").split())
+        return abstract if len(abstract) <= 300 else abstract[:300].rsplit(" ", 1)[0] + "..."
+
+    def stats(self) -> Dict[str, int]:
+        """
+        How often summaries were reused rather than written
+
+        `requests` counts each paper once per digest conversation that selected it; `generated`
+        is the number of summaries the LLM actually wrote.
+        """
+        with self._lock:
+            counts = dict(self._counts)
+            counts["distinct_papers"] = len(self._summaries)
+        counts["summaries_saved"] = counts["requests"] - counts["generated"]
+        return counts
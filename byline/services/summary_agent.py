@@ -1,129 +1,494 @@
 import logging
 import json
-from typing import Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, Any, Iterable, List, Optional
 from openai import OpenAI
 from .arxiv_tools import ArxivTools
-from byline.models.user_models import UserInterest
-from byline.services.templates.agent_prompt import generate_agent_prompt
+from .agent_context import AgentContext, ContextBudget
+from .openai_batch import BatchRunner, response_text
+from .paper_summaries import PaperSummarizer, PaperSummaryStore, paper_key, parse_selection
+from .tool_registry import Tool, ToolRegistry
+from byline.models.user_models import User, UserInterest
+from byline.services.templates.agent_prompt import (
+    generate_agent_prompt, generate_digest_prompt, generate_digest_selection_prompt, generate_selection_prompt
+)
+from byline.services.templates.email_template import render_interest_section
+from byline.utils.concurrency import service_limits
+from byline.utils.tracing import tracer
+
+class UsageStats:
+    """Thread-safe running totals of LLM calls and token usage"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+    
+    def record(self, usage):
+        """Record one responses.create call and its usage object, if any"""
+        with self._lock:
+            self.calls += 1
+            if usage is not None:
+                self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+                self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+    
+    def to_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens
+            }
+
+@dataclass
+class ModelRoutes:
+    """Model used for each kind of LLM step"""
+    # Searching arXiv and choosing papers: many calls with large inputs and short answers
+    plan: str = "gpt-4.1-mini"
+    # Writing the text users read
+    write: str = "gpt-4.1"
+
+class CachedResponse:
+    """Stand-in for a Responses API result replayed from the disk cache"""
+    
+    def __init__(self, data: Dict[str, Any]):
+        self.output = [SimpleNamespace(**item) for item in data["output"]]
+        self.output_text = data["output_text"]
+        self.usage = None
 
 class ExecutiveSummaryAgent:
     """LLM agent using OpenAI GPT-4 with function calling"""
     
-    def __init__(self, openai_api_key: str):
+    def __init__(self, openai_api_key: str, paper_store=None, cache=None, budget: ContextBudget = None, ranker=None,
+                 watermarks=None, paper_reader=None, paper_summary_store: Optional[PaperSummaryStore] = None,
+                 routes: Optional[ModelRoutes] = None, run_date: Optional[str] = None):
         self.client = OpenAI(api_key=openai_api_key)
-        self.model = "gpt-4.1"
-        self.arxiv_tools = ArxivTools()
+        self.routes = routes or ModelRoutes()
+        # Run the interest watermarks and cached responses are keyed by, so a rerun after midnight resumes the same run
+        self.run_date = run_date
+        self.cache = cache
+        self.budget = budget or ContextBudget()
+        self.ranker = ranker
+        self.watermarks = watermarks
+        self.paper_reader = paper_reader
+        # With shared paper summaries the model only selects papers, and digests are composed from the summaries
+        self.paper_summaries = None
+        if paper_summary_store is not None:
+            self.paper_summaries = PaperSummarizer(self.client, paper_summary_store, model=self.routes.write)
+        self.arxiv_tools = ArxivTools(paper_store=paper_store, cache=cache)
+        self.usage = UsageStats()
+        # Interest summaries composed from a batch before the run, by canonical key
+        self._batched: Dict[Any, str] = {}
         logging.info(f"ExecutiveSummaryAgent initialized with OpenAI API key: {openai_api_key[:8]}...")
         
-        self.tools = [
-            {
-                "type": "function",
-                "name": "search_arxiv_papers",
-                "description": "Search arXiv for academic papers within a specified time interval",
-                "parameters": {
+        self.tool_registry = ToolRegistry()
+        self.tool_registry.register(Tool(
+            name="search_arxiv_papers",
+            description="Search arXiv for academic papers within a specified time interval",
+            parameters={
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Search query to find relevant papers"
+                    },
+                    "days_back": {
+                        "type": "integer",
+                        "description": "Number of days to search back from today (default: 1)",
+                        "default": 1
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": "Maximum number of results to return (default: 10)",
+                        "default": 10
+                    }
+                },
+                "required": ["query"]
+            },
+            handler=lambda context, query, days_back=1, max_results=10: self.search_arxiv_papers(
+                query, days_back, max_results, since=context.since
+            ),
+            postprocess=lambda context, arguments, result: context.compact_search_results(result, arguments.get("query")),
+            max_concurrency=4,
+            timeout=90.0
+        ))
+        if paper_reader is not None:
+            self.tool_registry.register(Tool(
+                name="download_and_read_arxiv_paper",
+                description="Download an arXiv paper's PDF and read the text of its first pages. "
+                            "Only use this when the abstract is not enough to judge or summarize a paper.",
+                parameters={
                     "type": "object",
                     "properties": {
-                        "query": {
+                        "paper_id": {
                             "type": "string",
-                            "description": "Search query to find relevant papers"
-                        },
-                        "days_back": {
-                            "type": "integer",
-                            "description": "Number of days to search back from today (default: 1)",
-                            "default": 1
-                        },
-                        "max_results": {
-                            "type": "integer",
-                            "description": "Maximum number of results to return (default: 10)",
-                            "default": 10
+                            "description": "arXiv ID or URL of the paper, e.g. 2501.01234v1"
                         }
                     },
-                    "required": ["query"]
-                }
-            }
-        ]
+                    "required": ["paper_id"]
+                },
+                handler=lambda context, paper_id: self.download_and_read_arxiv_paper(paper_id),
+                postprocess=lambda context, arguments, result: context.compact_paper_text(result),
+                max_concurrency=2,
+                timeout=120.0
+            ))
+    
+    @property
+    def model(self) -> str:
+        """
+        Model for the agent conversation
+        
+        When paper summaries are written separately the conversation only searches and selects,
+        so it goes to the cheaper planning model. Otherwise it writes the digest itself.
+        """
+        return self.routes.plan if self.paper_summaries is not None else self.routes.write
+    
+    @property
+    def tools(self) -> List[Dict[str, Any]]:
+        return self.tool_registry.schemas()
     
-    def search_arxiv_papers(self, query: str, days_back: int = 1, max_results: int = 10) -> Dict[str, Any]:
+    def search_arxiv_papers(self, query: str, days_back: int = 1, max_results: int = 10,
+                            since: Optional[datetime] = None) -> Dict[str, Any]:
         """Function to search arXiv papers"""
         logging.info(f"search_arxiv_papers function called with query: '{query}', days_back: {days_back}, max_results: {max_results}")
-        result = self.arxiv_tools.search_papers_by_time_interval(query, days_back, max_results)
-        logging.info(f"search_arxiv_papers function completed successfully")
+        result = self.arxiv_tools.search_papers_by_time_interval(query, days_back, max_results, since=since)
+        logging.info("search_arxiv_papers function completed successfully")
         return result
     
-    def create_executive_summary(self, user_interest: UserInterest) -> str:
-        """Chat with the agent using function calling for search"""
-        logging.info(f"create_executive_summary called with user_interest: {user_interest}")
+    def download_and_read_arxiv_paper(self, paper_id: str) -> Dict[str, Any]:
+        """Function to read the full text of an arXiv paper"""
+        logging.info(f"download_and_read_arxiv_paper function called with paper_id: '{paper_id}'")
+        result = self.paper_reader.read(paper_id)
+        logging.info("download_and_read_arxiv_paper function completed successfully")
+        return result
+    
+    def _add_ranked_candidates(self, context: AgentContext, user_interest: UserInterest):
+        """Seed the conversation with the ranker's top papers as if the model had searched for the interest"""
+        with tracer.span("ranker.rank"):
+            ranked = self.ranker.rank(user_interest, top_k=self.budget.max_papers_per_search)
+        logging.info(f"Pre-ranked {len(ranked)} candidate papers for {user_interest.interest}")
         
-        prompt_message = generate_agent_prompt(user_interest)
+        call = SimpleNamespace(
+            call_id=f"ranked_candidates_{len(context.messages)}",
+            name="search_arxiv_papers",
+            arguments=json.dumps({"query": user_interest.interest, "days_back": 1, "max_results": len(ranked)})
+        )
+        context.add_function_call(call)
+        context.add_function_output(call.call_id, context.compact_search_results(
+            {"results": [paper for paper, _ in ranked], "total_found": len(ranked)},
+            user_interest.interest,
+            ranked=True
+        ))
+    
+    def _create_response(self, messages: List[Dict[str, Any]], tool_choice: str = "auto"):
+        """Call responses.create, replaying an identical earlier call from the cache when possible"""
+        cache_key = None
+        if self.cache is not None:
+            # The input carries every tool output so far, so the key covers the tool results too
+            cache_key = self.cache.make_key(
+                "openai", self._run_date(), self.model, messages, self.tools, tool_choice
+            )
+            cached = self.cache.get(cache_key, namespace="openai")
+            if cached is not None:
+                logging.info("Replaying model response from cache")
+                tracer.incr("openai.cache_hits")
+                return CachedResponse(cached)
         
-        messages = [
-            {"role": "user", "content": prompt_message}
-        ]
-
-        response = None
-        should_continue = True
-
-        while should_continue:
-            
-            response = self.client.responses.create(    
+        with service_limits.limit("openai"), tracer.span("openai.responses_create"):
+            response = self.client.responses.create(
                 model=self.model,
                 input=messages,
                 tools=self.tools,
+                tool_choice=tool_choice,
+                max_output_tokens=self.budget.max_output_tokens,
             )
+        usage = getattr(response, "usage", None)
+        self.usage.record(usage)
+        tracer.incr("openai.calls")
+        tracer.incr("openai.input_tokens", getattr(usage, "input_tokens", None) or 0)
+        tracer.incr("openai.output_tokens", getattr(usage, "output_tokens", None) or 0)
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, {
+                "output": [item.model_dump(mode="json", exclude_none=True) for item in response.output],
+                "output_text": response.output_text
+            }, namespace="openai")
+        return response
+    
+    def _run_date(self) -> str:
+        return self.run_date or datetime.now().strftime("%Y-%m-%d")
+    
+    def _interest_window(self, user_interest: UserInterest, window_end: datetime) -> Optional[datetime]:
+        """Start of the search window for an interest, from its watermark"""
+        if self.watermarks is None:
+            return None
+        return self.watermarks.window_start(
+            "interest", json.dumps(user_interest.canonical_key()), self._run_date(), window_end - timedelta(days=1)
+        )
+    
+    def _advance_interest(self, user_interest: UserInterest, window_end: datetime):
+        if self.watermarks is not None:
+            self.watermarks.advance("interest", json.dumps(user_interest.canonical_key()), window_end.isoformat())
+    
+    def _run_conversation(self, context: AgentContext, label: str) -> str:
+        """
+        Run the tool-calling loop until the model answers or the context budget is spent
+        
+        All function calls returned in one turn are dispatched concurrently through the tool
+        registry; their outputs are added to the context in the order the model issued them.
+        """
+        while True:
+            # The final answer counts as one of the budgeted calls
+            final = context.exhausted()
+            if final and context.iterations:
+                logging.warning(
+                    f"Context budget reached after {context.iterations} calls and {context.input_tokens} input tokens. "
+                    "Asking for the final summary without further tool calls."
+                )
+            response = self._create_response(context.messages, tool_choice="none" if final else "auto")
+            context.record_usage(response.usage)
             
             # Handle tool calls if any
-            output = response.output
-            has_function_calls = False
+            function_calls = [message for message in response.output if message.type == "function_call"]
+            if final or not function_calls:
+                break
 
-            for message in output:
-                if message.type == "function_call":
-                    has_function_calls = True
-                    logging.info(f"Tool calls detected.")
-                    messages.append(message)
-                
-                    logging.info(f"Processing tool call: {message.name}")
-                    if message.name == "search_arxiv_papers":
-                        function_args = json.loads(message.arguments)
-                        query = function_args.get("query")
-                        days_back = function_args.get("days_back", 30)
-                        max_results = function_args.get("max_results", 10)
-                        
-                        logging.info(f"Executing search_arxiv_papers with args: {function_args}")
-                        
-                        search_results = self.search_arxiv_papers(query, days_back, max_results)
-                        
-                        messages.append({
-                            "call_id": message.call_id,
-                            "type": "function_call_output",
-                            "output": json.dumps(search_results)
-                        })
-                        
-                    elif message.name == "download_and_read_arxiv_paper":
-                        function_args = json.loads(message.arguments)
-                        paper_id = function_args.get("paper_id")
-                        
-                        logging.info(f"Executing download_arxiv_paper with args: {function_args}")
-                        paper_results = self.download_and_read_arxiv_paper(paper_id)
-                        
-                        messages.append({
-                            "call_id": message.call_id,
-                            "type": "function_call_output", 
-                            "output": json.dumps(paper_results)
-                        })  
-                
-                elif message.type == "text":
-                    logging.info(f"Text message received: {message.text}")
-                    messages.append(message)
+            logging.info(f"{len(function_calls)} tool calls detected.")
+            for message in function_calls:
+                context.add_function_call(message)
             
-            should_continue = has_function_calls
-
-            if not should_continue:
-                break
+            outputs = self.tool_registry.dispatch(function_calls, context)
+            for message, output in zip(function_calls, outputs):
+                context.add_function_output(message.call_id, output)
+        
+        context.log_usage(label)
+        return response.output_text
+    
+    def _compose_from_selection(self, context: AgentContext, output_text: str, user_interests: List[UserInterest]) -> str:
+        """Digest HTML for the papers the model selected per interest, written from the shared paper summaries"""
+        selections = parse_selection(output_text, [user_interest.interest for user_interest in user_interests])
+        # The model may drop or change the version suffix, so shown papers are also matched by versionless ID
+        by_arxiv_id = {}
+        for paper_id, paper in context.papers.items():
+            key = paper_key(paper_id)
+            if key is not None:
+                by_arxiv_id[key[0]] = paper
+        
+        chosen = []
+        for paper_ids in selections:
+            papers = {}
+            for paper_id in paper_ids:
+                key = paper_key(paper_id)
+                paper = context.papers.get(paper_id) or (by_arxiv_id.get(key[0]) if key is not None else None)
+                if paper is not None:
+                    papers.setdefault(paper["id"], paper)
+            chosen.append(list(papers.values())[:self.budget.max_selected_papers])
+        
+        with tracer.span("paper_summaries.summarize"):
+            summaries = self.paper_summaries.summarize([paper for papers in chosen for paper in papers])
+        return "\n".join(
+            render_interest_section(user_interest.interest, [(paper, summaries[paper["id"]]) for paper in papers])
+            for user_interest, papers in zip(user_interests, chosen)
+        )
+    
+    def create_executive_summary(self, user_interest: UserInterest) -> str:
+        """
+        Chat with the agent using function calling for search, within the context budget
+        
+        With a watermark store, searches cover everything published since the interest was last
+        summarized rather than the number of days the model asks for. With shared paper summaries,
+        the model only selects papers and the summary is composed from each paper's stored blurb.
+        A summary prepared by `prepare_batch` is used as is.
+        """
+        logging.info(f"create_executive_summary called with user_interest: {user_interest}")
+        
+        window_end = datetime.now()
+        since = self._interest_window(user_interest, window_end)
+        
+        result = self._batched.pop(user_interest.canonical_key(), None)
+        if result is not None:
+            logging.info(f"Using the summary prepared in batch for {user_interest.interest}")
+        else:
+            context = self._interest_context(user_interest, since)
+            result = self._run_conversation(context, user_interest.interest)
+            if self.paper_summaries is not None:
+                result = self._compose_from_selection(context, result, [user_interest])
+        self._advance_interest(user_interest, window_end)
+        logging.info("Final response generated")
+        return result
+    
+    def _interest_context(self, user_interest: UserInterest, since: Optional[datetime]) -> AgentContext:
+        """Conversation for one interest as it starts: the prompt, plus the ranked candidates if there is a ranker"""
+        with tracer.span("prompt.generate"):
+            if self.paper_summaries is not None:
+                prompt_message = generate_selection_prompt(user_interest)
+            else:
+                prompt_message = generate_agent_prompt(user_interest)
+        context = AgentContext(
+            prompt_message,
+            self.budget,
+            focus=" ".join([user_interest.interest or ""] + list(user_interest.subinterests or [])),
+            since=since
+        )
+        if self.ranker is not None:
+            self._add_ranked_candidates(context, user_interest)
+        return context
+    
+    def prepare_batch(self, user_interests: Iterable[UserInterest], runner: BatchRunner,
+                      run_date: Optional[str] = None, workers: int = 4) -> Dict[str, int]:
+        """
+        Select papers for many interests and summarize them through the Batch API, ahead of the run
+        
+        Each interest becomes one request: its conversation as it starts, with the ranked candidates
+        already in it, answered without further tool calls. Summaries of every candidate paper that
+        has none yet go into the same batch file, so all the work is one batch; candidates the model
+        does not select keep their summaries for later digests. Interests whose request fails are
+        left to the usual conversation during the run.
         
-        result = response.output_text
-        logging.info(f"Final response generated")
+        Needs the ranker and shared paper summaries.
+        
+        Args:
+            user_interests: Interests of the users to be processed, repeats are submitted once
+            runner: Batch API runner
+            run_date: Run the paper summaries are recorded under
+            workers: Number of interest digests composed at the same time once the batch returns
+        
+        Returns:
+            Dictionary with the number of interests and papers submitted and prepared
+        """
+        if self.ranker is None or self.paper_summaries is None:
+            raise ValueError("Batch mode needs the paper ranker and shared paper summaries")
+        
+        contexts: Dict[str, Any] = {}
+        requests: Dict[str, Dict[str, Any]] = {}
+        seen = set()
+        for user_interest in user_interests:
+            key = user_interest.canonical_key()
+            if key in seen or key in self._batched:
+                continue
+            seen.add(key)
+            context = self._interest_context(user_interest, None)
+            custom_id = f"interest-{len(contexts)}"
+            contexts[custom_id] = (user_interest, context)
+            requests[custom_id] = {
+                "model": self.model,
+                "input": context.messages,
+                "tools": self.tools,
+                "tool_choice": "none",
+                "max_output_tokens": self.budget.max_output_tokens
+            }
+        
+        candidates = [paper for _, context in contexts.values() for paper in context.papers.values()]
+        missing = self.paper_summaries.missing(candidates)
+        chunks: Dict[str, List[Dict[str, Any]]] = {}
+        for start in range(0, len(missing), self.paper_summaries.batch_size):
+            custom_id = f"papers-{len(chunks)}"
+            chunks[custom_id] = missing[start:start + self.paper_summaries.batch_size]
+            requests[custom_id] = self.paper_summaries.request_body(chunks[custom_id])
+        
+        logging.info(f"Submitting {len(contexts)} interests and {len(missing)} paper summaries as one batch")
+        results = runner.run(requests)
+        
+        papers_prepared = 0
+        for custom_id, papers in chunks.items():
+            body = results.get(custom_id)
+            if body is None:
+                continue
+            usage = body.get("usage") or {}
+            self.paper_summaries.record_usage(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+            try:
+                summaries = self.paper_summaries.parse_summaries(papers, response_text(body))
+            except ValueError as e:
+                logging.warning(f"Unreadable paper summaries in batch result {custom_id}: {e}")
+                continue
+            papers_prepared += self.paper_summaries.add(papers, summaries, run_date)
+        
+        # Selected papers that still lack a summary are summarized interactively, so the digests are
+        # composed concurrently, on a pool of their own that leaves the tool workers free
+        composing = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-compose") as executor:
+            for custom_id, (user_interest, context) in contexts.items():
+                body = results.get(custom_id)
+                if body is None:
+                    continue
+                usage = body.get("usage") or {}
+                self.usage.record(SimpleNamespace(**usage))
+                context.record_usage(SimpleNamespace(**usage))
+                composing[user_interest.canonical_key()] = executor.submit(
+                    self._compose_from_selection, context, response_text(body), [user_interest]
+                )
+            for key, future in composing.items():
+                try:
+                    self._batched[key] = future.result()
+                except Exception as e:
+                    logging.error(f"Composing batched digest for {key} failed, leaving it to the run: {e}")
+        
+        stats = {
+            "interests": len(contexts),
+            "interests_prepared": sum(1 for key in composing if key in self._batched),
+            "papers": len(missing),
+            "papers_prepared": papers_prepared,
+            "requests": len(requests),
+            "requests_failed": len(requests) - len(results)
+        }
+        logging.info(
+            f"Batch prepared {stats['interests_prepared']}/{stats['interests']} interests and "
+            f"{stats['papers_prepared']}/{stats['papers']} paper summaries"
+        )
+        return stats
+    
+    def create_user_digest(self, user: User) -> str:
+        """
+        Write one digest covering all of a user's interests in a single conversation
+        
+        The model is asked to search for every interest in parallel tool calls in its first turn,
+        so the prompt overhead and round-trips are paid once per user instead of once per interest.
+        The context budget grows with the number of interests; the search window starts at the
+        oldest of the interests' watermarks.
+        """
+        logging.info(f"create_user_digest called for {user.email} with {len(user.user_interests)} interests")
+        
+        window_end = datetime.now()
+        windows = [self._interest_window(user_interest, window_end) for user_interest in user.user_interests]
+        since = min((window for window in windows if window is not None), default=None)
+        
+        with tracer.span("prompt.generate"):
+            if self.paper_summaries is not None:
+                prompt_message = generate_digest_selection_prompt(user)
+            else:
+                prompt_message = generate_digest_prompt(user)
+        interests = max(1, len(user.user_interests))
+        budget = replace(self.budget, max_input_tokens=self.budget.max_input_tokens * interests)
+        context = AgentContext(
+            prompt_message,
+            budget,
+            focus=" ".join(
+                " ".join([user_interest.interest or ""] + list(user_interest.subinterests or []))
+                for user_interest in user.user_interests
+            ),
+            since=since
+        )
+        if self.ranker is not None:
+            for user_interest in user.user_interests:
+                self._add_ranked_candidates(context, user_interest)
+        
+        result = self._run_conversation(context, f"{user.email} ({interests} interests)")
+        if self.paper_summaries is not None:
+            result = self._compose_from_selection(context, result, user.user_interests)
+        for user_interest in user.user_interests:
+            self._advance_interest(user_interest, window_end)
+        logging.info("Final digest generated")
         return result
     
     def process_interests_and_query(self, user_interest: UserInterest) -> str:
         """Process user interests and query using function calling"""
         return self.create_executive_summary(user_interest)
+    
+    def close(self):
+        """Stop the tool worker threads"""
+        self.tool_registry.close()
@@ -1,4 +1,16 @@
-from byline.models.user_models import UserInterest
+import json
+from typing import Any, Dict, List
+from byline.models.user_models import User, UserInterest
+
+SELECTION_OUTPUT = """## Output
+    Do not write summaries of the papers. Short summaries of the papers you choose are added to the digest separately.
+    
+    ## Output Format
+    Respond with JSON only, listing the `id` of each chosen paper exactly as the search results give it, most relevant first.
+    Use an empty list for an interest with no relevant papers.
+    {"interests": [{"interest": "TOPIC", "papers": ["PAPER_ID", "PAPER_ID"]}]}
+    """
+
 
 def generate_agent_prompt(user_interest: UserInterest) -> str:
     return f"""Your job is to provide the user an executive summary of the research that has been done on their interests in the last 1 day.
@@ -29,4 +41,93 @@ def generate_agent_prompt(user_interest: UserInterest) -> str:
         <li>Summary of research paper, if information is available. <a href="paper_url">Link to the paper</a> if available.</li>
         <li>If no information is available, say "No papers found."</li>
     </ul>
-    """
\ No newline at end of file
+    """
+
+
+def generate_digest_prompt(user: User) -> str:
+    interests = "\n    ".join(f"- {user_interest.to_dict()}" for user_interest in user.user_interests)
+    return f"""Your job is to provide the user an executive summary of the research that has been done on all of their interests in the last 1 day.
+
+    ## Instructions
+    1. In your first turn, call search_arxiv_papers once for every interest below, all in parallel. Do not wait for one search before issuing the next.
+    2. After the searches return, narrow down to the most relevant papers for each interest. Most relevant papers are the ones that are you believe will make the biggest impact on the field.
+    3. Prune the search results to find the 2-4 most relevant papers per interest. Limit your search to the last 1 day.
+    4. Create a detailed summary of the abstract for each paper.
+    5. Only search again for an interest if its first search returned nothing useful.
+    6. If no information is available for an interest, say a quirky line about how it has been a quiet day for research.
+        
+    ## User Interests
+    The user is interested in research in the following areas:
+    {interests}
+    
+    ## Functions
+    You will use the search_arxiv_papers function to find relevant information and provide helpful responses based on their interests.
+
+    ## Output
+    Your response should contain every interest listed above, in the same order, with bullet points on each of the most relevant papers.
+    Your tone should be authoritative and informative. Keep it short and concise.
+    
+    ## Output Format
+    Respond in HTML format. For each interest, you should have a heading and a list of bullet points.
+    <h3>TOPIC</h3>
+    <ul>
+        <li>Summary of research paper, if information is available. <a href="paper_url">Link to the paper</a> if available.</li>
+        <li>If no information is available, say "No papers found."</li>
+    </ul>
+    """
+
+
+def generate_selection_prompt(user_interest: UserInterest) -> str:
+    return f"""Your job is to choose the research papers published in the last 1 day that matter most to the user's interest.
+
+    ## Instructions
+    1. Perform a broad search for relevant papers related to the user's interest.
+    2. After performing the search, narrow down to the most relevant papers. Most relevant papers are the ones that are you believe will make the biggest impact on the field.
+    3. Prune the search results to the 2-4 most relevant papers. Limit your search to the last 1 day.
+        
+    ## User Interests
+    The user is interested in research in the following area:
+    {user_interest.to_dict()}.
+    
+    ## Functions
+    You will use the search_arxiv_papers function to find relevant papers.
+
+    """ + SELECTION_OUTPUT
+
+
+def generate_digest_selection_prompt(user: User) -> str:
+    interests = "\n    ".join(f"- {user_interest.to_dict()}" for user_interest in user.user_interests)
+    return f"""Your job is to choose the research papers published in the last 1 day that matter most to each of the user's interests.
+
+    ## Instructions
+    1. In your first turn, call search_arxiv_papers once for every interest below, all in parallel. Do not wait for one search before issuing the next.
+    2. After the searches return, narrow down to the most relevant papers for each interest. Most relevant papers are the ones that are you believe will make the biggest impact on the field.
+    3. Prune the search results to the 2-4 most relevant papers per interest. Limit your search to the last 1 day.
+    4. Only search again for an interest if its first search returned nothing useful.
+        
+    ## User Interests
+    The user is interested in research in the following areas:
+    {interests}
+    
+    ## Functions
+    You will use the search_arxiv_papers function to find relevant papers.
+
+    """ + SELECTION_OUTPUT + """Include every interest listed above, in the same order, using its `interest` text as TOPIC.
+    """
+
+
+def generate_paper_summary_prompt(papers: List[Dict[str, Any]]) -> str:
+    paper_lines = "\n    ".join(json.dumps(paper) for paper in papers)
+    return f"""Write a short summary of each research paper below for a daily research digest.
+
+    ## Instructions
+    1. Summarize each paper in one or two sentences: what the authors did and why it matters.
+    2. Your tone should be authoritative and informative. The same summary is sent to many readers, so do not address any particular reader or interest.
+    
+    ## Papers
+    {paper_lines}
+    
+    ## Output Format
+    Respond with a JSON object mapping the `id` of every paper to its summary, and nothing else.
+    {{"PAPER_ID": "Summary of the paper."}}
+    """
@@ -0,0 +1,48 @@
+from functools import lru_cache
+from html import escape
+from typing import Any, Dict, List, Tuple
+from byline.services.templates.render import CompiledTemplate
+
+EMAIL_SUBJECT = CompiledTemplate("[Byline Update] | $date")
+
+EMAIL_BODY = CompiledTemplate("""
+        <html>
+        <body>
+            <h2>Research Summary</h2>
+            <hr/>
+            <div style="white-space: pre-wrap; font-family: Arial, sans-serif;">
+            $summary
+            </div>
+        </body>
+        </html>
+        """)
+
+INTEREST_SECTION = CompiledTemplate("<h3>$interest</h3>\n<ul>\n$items</ul>")
+
+PAPER_ITEM = CompiledTemplate('    <li><b>$title</b>: $summary <a href="$url">Link to the paper</a></li>\n')
+
+NO_PAPERS_ITEM = "    <li>No papers found.</li>\n"
+
+
+@lru_cache(maxsize=8)
+def render_email_subject(date: str) -> str:
+    """Subject line for a run date (YYYY-MM-DD). Every recipient of a run shares it."""
+    return EMAIL_SUBJECT.render(date=date)
+
+
+def render_email_body(summary: str) -> str:
+    """Wrap an HTML digest in the email skeleton"""
+    return EMAIL_BODY.render(summary=summary)
+
+
+def render_interest_section(interest: str, papers: List[Tuple[Dict[str, Any], str]]) -> str:
+    """One interest's part of a digest, composed from (paper, short summary) pairs"""
+    items = "".join(
+        PAPER_ITEM.render(
+            title=escape(" ".join(paper.get("title", "").split())),
+            summary=escape(summary),
+            url=escape(paper["id"])
+        )
+        for paper, summary in papers
+    )
+    return INTEREST_SECTION.render(interest=escape(interest), items=items or NO_PAPERS_ITEM)
@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+from string import Template
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+
+class CompiledTemplate:
+    """
+    `string.Template` parsed once into literal text and placeholders
+
+    Rendering joins the pre-split parts instead of re-scanning the template with a regex on every call.
+    Placeholders use the usual `$name` / `${name}` syntax, and `$$` is a literal dollar sign.
+    """
+
+    def __init__(self, template: str):
+        self.template = Template(template)
+        self.placeholders: List[str] = []
+        self._parts: List[str] = [""]
+        self._slots: List[Tuple[int, str]] = []
+        position = 0
+        for match in self.template.pattern.finditer(template):
+            self._parts[-1] += template[position:match.start()]
+            position = match.end()
+            name = match.group("named") or match.group("braced")
+            if match.group("escaped") is not None:
+                self._parts[-1] += self.template.delimiter
+            elif name:
+                self.placeholders.append(name)
+                self._slots.append((len(self._parts), name))
+                self._parts.extend(["", ""])
+            else:
+                raise ValueError(f"Invalid placeholder in template at position {match.start()}")
+        self._parts[-1] += template[position:]
+
+    def render(self, **values: Any) -> str:
+        """Fill every placeholder. Missing values raise KeyError, like `Template.substitute`."""
+        parts = self._parts[:]
+        for index, name in self._slots:
+            parts[index] = str(values[name])
+        return "".join(parts)
+
+
+class FragmentCache:
+    """Thread-safe, size-bounded LRU cache of rendered fragments, usually keyed by canonical interest key"""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, render: Callable[[], Any]) -> Any:
+        """Return the cached fragment for `key`, calling `render()` to build it on a miss"""
+        with self._lock:
+            if key in self._items:
+                self.hits += 1
+                self._items.move_to_end(key)
+                return self._items[key]
+            self.misses += 1
+
+        # Rendering is pure, so two threads racing on the same key at worst render it twice
+        value = render()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._items)}
@@ -0,0 +1,151 @@
+import logging
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from byline.utils.tracing import tracer
+
+
+@dataclass
+class Tool:
+    """
+    A function the model can call
+
+    `handler(context, **arguments)` runs on a worker thread and returns the raw result.
+    `postprocess(context, arguments, result)`, if set, runs on the caller's thread in call order
+    and shapes the result before it enters the conversation.
+    """
+    name: str
+    description: str
+    parameters: Dict[str, Any]
+    handler: Callable[..., Dict[str, Any]]
+    postprocess: Optional[Callable[[Any, Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = None
+    max_concurrency: int = 4
+    timeout: float = 60.0
+    _semaphore: threading.BoundedSemaphore = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+
+    def schema(self) -> Dict[str, Any]:
+        return {
+            "type": "function",
+            "name": self.name,
+            "description": self.description,
+            "parameters": self.parameters
+        }
+
+
+class _Slot:
+    """One call's hold on its tool's semaphore, released exactly once by whichever side gives it up first"""
+
+    def __init__(self, semaphore: threading.BoundedSemaphore):
+        self._semaphore = semaphore
+        self._lock = threading.Lock()
+        self._held = False
+        self._abandoned = False
+
+    def acquire(self, timeout: float) -> bool:
+        if not self._semaphore.acquire(timeout=timeout):
+            return False
+        with self._lock:
+            if self._abandoned:
+                self._semaphore.release()
+                return False
+            self._held = True
+        return True
+
+    def release(self):
+        """Give the slot back, for the worker when the handler returns or for the caller when it stops waiting"""
+        with self._lock:
+            if self._held:
+                self._semaphore.release()
+            self._held = False
+            self._abandoned = True
+
+
+class ToolRegistry:
+    """Tools available to the agent, dispatched concurrently with per-tool concurrency limits and timeouts"""
+
+    def __init__(self, max_workers: int = 16):
+        self._tools: Dict[str, Tool] = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+
+    def register(self, tool: Tool) -> Tool:
+        self._tools[tool.name] = tool
+        logging.info(f"Registered tool {tool.name} (concurrency {tool.max_concurrency}, timeout {tool.timeout}s)")
+        return tool
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def schemas(self) -> List[Dict[str, Any]]:
+        """Tool definitions in the Responses API format, in registration order"""
+        return [tool.schema() for tool in self._tools.values()]
+
+    def _run(self, tool: Tool, slot: _Slot, deadline: float, context: Any, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        if not slot.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise TimeoutError(f"{tool.name} timed out waiting for a free slot")
+        try:
+            with tracer.span(f"tool.{tool.name}"):
+                return tool.handler(context, **arguments)
+        finally:
+            slot.release()
+
+    def dispatch(self, calls: List[Any], context: Any = None) -> List[Dict[str, Any]]:
+        """
+        Execute the function calls of one model turn concurrently
+
+        Failures, unknown tools and timeouts are returned to the model as `{"error": ...}` outputs
+        rather than raised, so one bad call does not abort the conversation.
+
+        Args:
+            calls: Function call items with `name` and JSON `arguments`
+            context: Conversation state passed to every handler and postprocess hook
+
+        Returns:
+            One output per call, in call order
+        """
+        pending = []
+        for call in calls:
+            tool = self._tools.get(call.name)
+            if tool is None:
+                pending.append((call, None, {}, {"error": f"Unknown tool: {call.name}"}))
+                continue
+            try:
+                arguments = json.loads(call.arguments or "{}")
+            except json.JSONDecodeError as e:
+                pending.append((call, None, {}, {"error": f"Invalid arguments for {call.name}: {e}"}))
+                continue
+            logging.info(f"Executing {call.name} with args: {arguments}")
+            deadline = time.monotonic() + tool.timeout
+            slot = _Slot(tool._semaphore)
+            future = self.executor.submit(self._run, tool, slot, deadline, context, arguments)
+            pending.append((call, (tool, slot, deadline, future), arguments, None))
+
+        outputs = []
+        for call, running, arguments, output in pending:
+            if running is not None:
+                tool, slot, deadline, future = running
+                try:
+                    output = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                    if tool.postprocess is not None:
+                        output = tool.postprocess(context, arguments, output)
+                except TimeoutError:
+                    # The abandoned call may keep running, but no longer counts against the tool's limit
+                    future.cancel()
+                    slot.release()
+                    tracer.incr(f"tool.{tool.name}.timeouts")
+                    logging.error(f"Tool call {call.name} timed out after {tool.timeout}s")
+                    output = {"error": f"{call.name} timed out after {tool.timeout:g}s"}
+                except Exception as e:
+                    logging.error(f"Tool call {call.name} failed: {e}")
+                    output = {"error": str(e)}
+            outputs.append(output)
+        return outputs
+
+    def close(self):
+        """Stop the worker threads. Calls still running are abandoned rather than waited for."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
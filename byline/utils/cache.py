@@ -0,0 +1,122 @@
+import logging
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+
+class DiskCache:
+    """Persistent content-addressed cache for JSON-serializable values, backed by SQLite"""
+
+    def __init__(self, db_path: str = "data/cache/cache.db", ttl_seconds: float = 12 * 3600, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            db_path: Location of the SQLite cache file
+            ttl_seconds: Entries older than this are treated as misses and removed
+            max_bytes: Least recently used entries are evicted once the cache grows past this size
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "bytes_read": 0, "bytes_written": 0})
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries(accessed_at)")
+        self.evict()
+        logging.info(f"DiskCache initialized at {db_path} ({self.size_bytes()} bytes)")
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Hash arbitrary JSON-serializable parts into a content address"""
+        payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, namespace: str = "default") -> Optional[Any]:
+        """Return the cached value for the key, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            stats = self._stats[namespace]
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    with self.conn:
+                        self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._total_bytes -= len(row[0])
+                stats["misses"] += 1
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            stats["hits"] += 1
+            stats["bytes_read"] += len(row[0])
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, namespace: str = "default"):
+        """Store a JSON-serializable value under the key"""
+        payload = json.dumps(value, default=str)
+        now = time.time()
+        with self._lock:
+            with self.conn:
+                previous = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, namespace, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, namespace, payload, len(payload), now, now)
+                )
+            self._stats[namespace]["bytes_written"] += len(payload)
+            self._total_bytes += len(payload) - (previous[0] if previous else 0)
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._total_bytes
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used entries until the cache fits in max_bytes"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock, self.conn:
+            evicted = self.conn.execute("DELETE FROM entries WHERE created_at < ?", (cutoff,)).rowcount
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    total -= size
+                    evicted += 1
+            self._total_bytes = total
+        if evicted:
+            logging.info(f"DiskCache evicted {evicted} entries")
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits, misses and bytes per namespace plus the current on-disk size"""
+        with self._lock:
+            namespaces = {namespace: dict(values) for namespace, values in self._stats.items()}
+        return {
+            "namespaces": namespaces,
+            "size_bytes": self.size_bytes()
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
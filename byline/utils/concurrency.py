@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Default number of concurrent in-flight requests per upstream service
+DEFAULT_SERVICE_LIMITS = {
+    "openai": 8,
+    "arxiv": 1,
+    "arxiv_pdf": 2,
+    "smtp": 2
+}
+
+
+class ServiceLimits:
+    """Bounded concurrency per upstream service, shared by every worker thread"""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        # Built at import time through the module-level `service_limits`, before the entry point has set up
+        # logging, so the defaults are not logged: a log call now would configure the root logger first
+        self._set_limits(limits or DEFAULT_SERVICE_LIMITS)
+
+    def _set_limits(self, limits: Dict[str, int]):
+        with self._lock:
+            for service, limit in limits.items():
+                self._semaphores[service] = threading.BoundedSemaphore(max(1, limit))
+
+    def configure(self, **limits: int):
+        """Set the maximum number of concurrent calls for each named service"""
+        self._set_limits(limits)
+        for service, limit in limits.items():
+            logging.info(f"Concurrency limit for {service} set to {limit}")
+
+    @contextmanager
+    def limit(self, service: str):
+        """Block until a slot for the service is free and hold it for the duration of the block"""
+        with self._lock:
+            semaphore = self._semaphores.get(service)
+        if semaphore is None:
+            yield
+            return
+        with semaphore:
+            yield
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Tokens added per second
+            burst: Maximum number of tokens that can accumulate
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a token is available. Returns the number of seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                sleep_for = (1 - self._tokens) / self.rate
+            time.sleep(sleep_for)
+            waited += sleep_for
+
+
+class LatencyStats:
+    """Thread-safe collection of latency samples"""
+
+    def __init__(self):
+        self._samples: List[float] = []
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        index = max(0, int(round(pct / 100 * len(samples))) - 1)
+        return samples[index]
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            samples = list(self._samples)
+        return {
+            "count": len(samples),
+            "total": sum(samples),
+            "mean": sum(samples) / len(samples) if samples else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": max(samples) if samples else 0.0
+        }
+
+
+# Process-wide limits used by the OpenAI, arXiv and SMTP clients
+service_limits = ServiceLimits()
@@ -1,24 +1,26 @@
 import json
-from byline.models.user_models import User, UserInterest
+from typing import Iterator, List
+from byline.models.user_models import User, interest_table
+from byline.utils.sharding import in_shard
 
-def load_test_users(json_file_path: str) -> list:
-    """Load users from JSON file for testing"""
+def iter_test_users(json_file_path: str, shard_index: int = 0, shard_count: int = 1) -> Iterator[User]:
+    """Lazily build users from a JSON test file, only those in the given shard"""
     with open(json_file_path, 'r') as f:
         data = json.load(f)
     
-    users = []
     for email, user_data in data.items():
-        user_interests = []
-        for interest in user_data.get("interests", []):
-            user_interests.append(UserInterest(
-                interest=interest.get("interest"),
-                subinterests=interest.get("subinterests", [])
-            ))
-        
-        users.append(User(
+        if not in_shard(email, shard_index, shard_count):
+            continue
+        interest_ids = tuple(
+            interest_table.add(interest.get("interest"), interest.get("subinterests", []))
+            for interest in user_data.get("interests", [])
+        )
+        yield User(
             id=email,
             email=email,
-            user_interests=user_interests
-        ))
-    
-    return users
\ No newline at end of file
+            interest_ids=interest_ids
+        )
+
+def load_test_users(json_file_path: str, shard_index: int = 0, shard_count: int = 1) -> List[User]:
+    """Load users from JSON file for testing, only those in the given shard"""
+    return list(iter_test_users(json_file_path, shard_index, shard_count))
@@ -0,0 +1,131 @@
+import logging
+import random
+import time
+from typing import Optional, Tuple, Union
+import arxiv
+import requests
+from requests.adapters import HTTPAdapter
+from byline.utils.concurrency import TokenBucket, service_limits
+from byline.utils.tracing import tracer
+
+# arXiv asks API clients to wait three seconds between requests
+ARXIV_DELAY_SECONDS = 3.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    """
+    Pooled HTTP session for one upstream service with rate limiting, retries and timing metrics
+
+    Every attempt waits for the service's concurrency slot (see `service_limits`) and a token from
+    its rate limiter, then records the time spent queueing separately from the time on the network,
+    as `<service>.queue_wait` and `<service>.network` stages in the run report. Connection errors,
+    timeouts, 429 and 5xx responses are retried with jittered exponential backoff, honouring
+    `Retry-After` when the server sends one.
+    """
+
+    def __init__(self, service: str, rate: Optional[float] = None, burst: int = 1, max_retries: int = 4,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 timeout: Union[float, Tuple[float, float]] = (10.0, 60.0), pool_size: int = 8):
+        """
+        Args:
+            service: Service name used for concurrency limits and metrics
+            rate: Maximum requests per second, or None for no rate limit
+            burst: Number of requests allowed back to back before the rate applies
+            max_retries: Retries after the first attempt
+            backoff_base: Upper bound of the first retry delay, in seconds. Doubles on every retry.
+            backoff_max: Cap on any single retry delay, in seconds
+            timeout: Default (connect, read) timeout per request, in seconds
+            pool_size: Connections kept open per host
+        """
+        self.service = service
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def configure(self, rate: Optional[float] = None, burst: int = 1, max_retries: Optional[int] = None,
+                  timeout: Optional[Union[float, Tuple[float, float]]] = None):
+        """Change the rate limit (None removes it), retry count or default timeout"""
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        if max_retries is not None:
+            self.max_retries = max_retries
+        if timeout is not None:
+            self.timeout = timeout
+        logging.info(f"HTTP client for {self.service}: rate {rate or 'unlimited'}/s, {self.max_retries} retries")
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying transient failures. The last response or error is returned or raised."""
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            queued = time.perf_counter()
+            response = None
+            error = None
+            with service_limits.limit(self.service):
+                if self.bucket is not None:
+                    self.bucket.acquire()
+                started = time.perf_counter()
+                tracer.record(f"{self.service}.queue_wait", started - queued)
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+                finally:
+                    tracer.record(f"{self.service}.network", time.perf_counter() - started)
+            tracer.incr(f"{self.service}.requests")
+
+            retryable = error is not None or response.status_code in RETRY_STATUSES
+            if not retryable or attempt == self.max_retries:
+                if error is not None:
+                    tracer.incr(f"{self.service}.errors")
+                    raise error
+                return response
+
+            delay = self._backoff(attempt, response)
+            reason = error if error is not None else f"HTTP {response.status_code}"
+            logging.warning(f"{self.service} request failed ({reason}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            tracer.incr(f"{self.service}.retries")
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+class ArxivApiClient(arxiv.Client):
+    """
+    `arxiv.Client` whose requests go through the shared arXiv HttpClient
+
+    The stock client enforces its delay per instance, so several clients (harvester, search tool,
+    concurrent workers) together exceed arXiv's limit. Here the delay is a token bucket shared by the
+    whole process, and retries use the HttpClient's backoff instead of immediate re-requests.
+    """
+
+    def __init__(self, page_size: int = 100, http: Optional[HttpClient] = None):
+        # One client-level retry is kept for arXiv's occasional unexpectedly empty pages
+        super().__init__(page_size=page_size, delay_seconds=0, num_retries=1)
+        self._session = http or arxiv_http
+
+
+# Process-wide clients shared by all services
+arxiv_http = HttpClient("arxiv", rate=1 / ARXIV_DELAY_SECONDS)
+arxiv_pdf_http = HttpClient("arxiv_pdf", rate=1.0, burst=2)
+exa_http = HttpClient("exa", rate=5.0, burst=5)
@@ -1,5 +1,6 @@
 import logging
 import os
+from typing import Dict, Iterable, Optional
 from dotenv import load_dotenv
 
 def setup_logging():
@@ -14,31 +15,28 @@ def setup_logging():
     )
     logging.info("Logging setup completed")
 
-def load_environment_variables():
-    """Load environment variables from .env file"""
+# Keys read from the environment. EXA_API_KEY is only needed by the optional Exa search service.
+ENVIRONMENT_KEYS = ["OPENAI_API_KEY", "SENDER_EMAIL", "SENDER_PASSWORD", "SUPABASE_URL", "SUPABASE_SERVICE_KEY", "EXA_API_KEY"]
+
+def load_environment_variables(required: Optional[Iterable[str]] = None) -> Dict[str, Optional[str]]:
+    """
+    Load environment variables from .env file
+
+    Args:
+        required: Keys that must be set, e.g. only the ones the selected run mode uses.
+            Defaults to every key except EXA_API_KEY.
+
+    Returns:
+        Dictionary of every known key, with None for keys that are not set
+    """
     load_dotenv(override=True)
     logging.info("Environment variables loaded")
-    # Get API keys
-    EXA_API_KEY = os.getenv("EXA_API_KEY")
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    SENDER_EMAIL = os.getenv("SENDER_EMAIL")
-    SENDER_PASSWORD = os.getenv("SENDER_PASSWORD")
-    SUPABASE_URL = os.getenv("SUPABASE_URL")
-    SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+    env_vars = {key: os.getenv(key) for key in ENVIRONMENT_KEYS}
 
     # Validate required environment variables
-    assert EXA_API_KEY is not None, "EXA_API_KEY not found in environment"
-    assert OPENAI_API_KEY is not None, "OPENAI_API_KEY not found in environment"
-    assert SENDER_EMAIL is not None, "SENDER_EMAIL not found in environment"
-    assert SENDER_PASSWORD is not None, "SENDER_PASSWORD not found in environment"
-    assert SUPABASE_URL is not None, "SUPABASE_URL not found in environment"
-    assert SUPABASE_SERVICE_KEY is not None, "SUPABASE_SERVICE_KEY not found in environment"
+    if required is None:
+        required = [key for key in ENVIRONMENT_KEYS if key != "EXA_API_KEY"]
+    for key in required:
+        assert env_vars.get(key) is not None, f"{key} not found in environment"
 
-    return {
-        "EXA_API_KEY": EXA_API_KEY,
-        "OPENAI_API_KEY": OPENAI_API_KEY,
-        "SENDER_EMAIL": SENDER_EMAIL,
-        "SENDER_PASSWORD": SENDER_PASSWORD,
-        "SUPABASE_URL": SUPABASE_URL,
-        "SUPABASE_SERVICE_KEY": SUPABASE_SERVICE_KEY
-    }
\ No newline at end of file
+    return env_vars
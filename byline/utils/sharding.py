@@ -0,0 +1,16 @@
+import hashlib
+
+
+def shard_of(user_id: str, shard_count: int) -> int:
+    """
+    Shard a user belongs to, stable across processes, machines and Python versions
+
+    Uses a hash of the ID rather than `hash()`, which is salted per process.
+    """
+    digest = hashlib.sha1(str(user_id).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def in_shard(user_id: str, shard_index: int, shard_count: int) -> bool:
+    return shard_count <= 1 or shard_of(user_id, shard_count) == shard_index
+
@@ -1,60 +1,106 @@
 import logging
-from typing import List
-from byline.models.user_models import User, UserInterest
+from collections import defaultdict
+from typing import Dict, Iterator, List, Tuple
+from byline.models.user_models import User, interest_table
+from byline.utils.sharding import in_shard
+from byline.utils.tracing import tracer
 from supabase import create_client, Client
 
+# PostgREST caps responses at 1000 rows by default
+PAGE_SIZE = 1000
+# Number of user IDs per `in_` filter, kept small enough for the request URL
+USER_ID_CHUNK_SIZE = 200
+
 class SupabaseClient:
     """Client for interacting with Supabase database"""
-    
+
     def __init__(self, supabase_url: str, supabase_key: str):
         self.client: Client = create_client(supabase_url, supabase_key)
         logging.info("SupabaseClient initialized")
-    
+
     def get_all_users(self) -> List[User]:
-        """Fetch all users with their interests from Supabase"""
+        """Fetch all users with their interests from Supabase. Prefer `iter_users`, which streams them."""
         try:
             logging.info("Fetching all users from Supabase")
-            
-            # First, fetch all users from the users table
-            users_response = self.client.table("users").select("id, email").execute()
-            
-            if not users_response.data:
+            users = list(self.iter_users())
+
+            if not users:
                 logging.warning("No users found in database")
-                return []
-            
-            users = []
-            for user_data in users_response.data:
-                user_id = user_data["id"]
-                user_email = user_data["email"]
-                
-                logging.info(f"Fetching interests for user {user_email} (ID: {user_id})")
-                
-                # Fetch interests for this user from user_interests table
-                interests_response = self.client.table("user_interests").select(
-                    "interest, subinterests"
-                ).eq("user_id", user_id).execute()
-                
-                # Parse user interests
-                user_interests = []
-                for interest_data in interests_response.data:
-                    user_interest = UserInterest(
-                        interest=interest_data["interest"],
-                        subinterests=interest_data["subinterests"]
-                    )
-                    user_interests.append(user_interest)
-                
-                # Create user object
-                user = User(
-                    id=user_id,
-                    email=user_email,
-                    user_interests=user_interests
-                )
-                users.append(user)
-            
-            logging.info(f"Successfully fetched {len(users)} users from Supabase")
+            else:
+                logging.info(f"Successfully fetched {len(users)} users from Supabase")
             return users
-            
+
         except Exception as e:
             logging.error(f"Error fetching users from Supabase: {e}")
             raise e
 
+    def iter_users(self, page_size: int = PAGE_SIZE, shard_index: int = 0, shard_count: int = 1) -> Iterator[User]:
+        """
+        Stream users with their interests one page at a time
+
+        Each page costs one `users` request plus one bulk `user_interests` request per
+        chunk of user IDs, so the first users can be processed before later pages arrive.
+        With several shards, every shard pages through the (small) `users` rows but only
+        fetches interests for the users in its own shard.
+
+        Args:
+            page_size: Number of users fetched per request
+            shard_index: Shard to return users for, from 0 to `shard_count - 1`
+            shard_count: Number of shards users are split across by a stable hash of their ID
+
+        Yields:
+            User objects with their interests populated
+        """
+        offset = 0
+        while True:
+            with tracer.span("supabase.users_page"):
+                users_response = self.client.table("users").select("id, email").order("id").range(
+                    offset, offset + page_size - 1
+                ).execute()
+            page = users_response.data or []
+            if not page:
+                return
+
+            logging.info(f"Fetched page of {len(page)} users from Supabase (offset {offset})")
+            full_page = len(page) == page_size
+            page = [user_data for user_data in page if in_shard(user_data["id"], shard_index, shard_count)]
+            interests_by_user = self._fetch_interests([user_data["id"] for user_data in page]) if page else {}
+
+            for user_data in page:
+                yield User(
+                    id=user_data["id"],
+                    email=user_data["email"],
+                    interest_ids=interests_by_user.get(user_data["id"], ())
+                )
+
+            if not full_page:
+                return
+            offset += page_size
+
+    def _fetch_interests(self, user_ids: List[str]) -> Dict[str, Tuple[int, ...]]:
+        """Bulk-fetch interests for a list of user IDs and group their interest table IDs by user"""
+        interests_by_user: Dict[str, List[int]] = defaultdict(list)
+
+        for start in range(0, len(user_ids), USER_ID_CHUNK_SIZE):
+            chunk = user_ids[start:start + USER_ID_CHUNK_SIZE]
+            offset = 0
+            while True:
+                with tracer.span("supabase.interests_page"):
+                    interests_response = self.client.table("user_interests").select(
+                        "user_id, interest, subinterests"
+                    ).in_("user_id", chunk).order("user_id").order("interest").range(
+                        offset, offset + PAGE_SIZE - 1
+                    ).execute()
+                rows = interests_response.data or []
+
+                for interest_data in rows:
+                    interests_by_user[interest_data["user_id"]].append(interest_table.add(
+                        interest_data["interest"],
+                        interest_data["subinterests"]
+                    ))
+
+                if len(rows) < PAGE_SIZE:
+                    break
+                offset += PAGE_SIZE
+
+        return {user_id: tuple(interest_ids) for user_id, interest_ids in interests_by_user.items()}
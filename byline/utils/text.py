@@ -0,0 +1,19 @@
+import re
+from typing import List
+
+_QUERY_FIELD_PREFIX = re.compile(r"\b(?:ti|abs|au|cat|all|co|jr|rn|id):", re.IGNORECASE)
+_QUERY_OPERATORS = {"and", "or", "andnot", "not", "to"}
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9.\-]*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into search tokens"""
+    return [token.strip(".-") for token in _TOKEN_PATTERN.findall(text.lower()) if token.strip(".-")]
+
+
+def query_terms(query: str) -> List[str]:
+    """Extract plain search terms from an arXiv-style query string"""
+    if not query:
+        return []
+    query = _QUERY_FIELD_PREFIX.sub(" ", query)
+    return [term for term in tokenize(query) if term not in _QUERY_OPERATORS]
@@ -0,0 +1,88 @@
+import logging
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional
+from byline.utils.concurrency import LatencyStats
+
+
+class Tracer:
+    """Lightweight span timers and counters for one run, reported as machine-readable JSON"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._spans: Dict[str, LatencyStats] = defaultdict(LatencyStats)
+            self._counters: Dict[str, float] = defaultdict(float)
+            self._started_at = datetime.now().isoformat()
+            self._start = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block under the given stage name. Failed blocks also count `<name>.errors`."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.incr(f"{name}.errors")
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            stats = self._spans[name]
+        stats.record(seconds)
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def stage(self, name: str) -> Dict[str, float]:
+        """Totals and percentiles for one stage"""
+        with self._lock:
+            stats = self._spans.get(name)
+        return stats.summary() if stats is not None else LatencyStats().summary()
+
+    def report(self, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        with self._lock:
+            spans = dict(self._spans)
+            counters = dict(self._counters)
+        report = {
+            "started_at": self._started_at,
+            "finished_at": datetime.now().isoformat(),
+            "wall_time": time.perf_counter() - self._start,
+            "stages": {name: stats.summary() for name, stats in sorted(spans.items())},
+            "counters": dict(sorted(counters.items()))
+        }
+        if extra:
+            report.update(extra)
+        return report
+
+    def write_report(self, path: str = "run_report.json", extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Write the run report as JSON and log a one-line summary per stage"""
+        report = self.report(extra)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+        for name, stats in report["stages"].items():
+            logging.info(
+                f"Stage {name}: {stats['count']} calls, {stats['total']:.2f}s total, "
+                f"p50 {stats['p50'] * 1000:.0f}ms, p95 {stats['p95'] * 1000:.0f}ms"
+            )
+        logging.info(f"Run report written to {path}")
+        return report
+
+
+# Process-wide tracer shared by all services
+tracer = Tracer()
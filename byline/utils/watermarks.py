@@ -0,0 +1,208 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# arXiv links in generated summaries, e.g. http://arxiv.org/abs/2501.01234v2 or https://arxiv.org/pdf/hep-th/9901001
+_ARXIV_LINK = re.compile(r"arxiv\.org/(?:abs|pdf)/([a-z\-]+(?:\.[A-Z]{2})?/\d{7}|\d{4}\.\d{4,5})(?:v\d+)?", re.IGNORECASE)
+_LIST_ITEM = re.compile(r"<li\b.*?</li>\s*", re.IGNORECASE | re.DOTALL)
+_EMPTY_LIST = re.compile(r"(<ul\b[^>]*>)(\s*)(</ul>)", re.IGNORECASE)
+
+
+def extract_paper_ids(html: str) -> List[str]:
+    """Versionless arXiv identifiers linked from a summary, in order of first appearance"""
+    return list(dict.fromkeys(match.group(1) for match in _ARXIV_LINK.finditer(html)))
+
+
+def drop_reported_papers(html: str, reported: Set[str]) -> Tuple[str, List[str]]:
+    """
+    Remove list items about papers already reported to the user, or already shown earlier in the same digest
+
+    Args:
+        html: Combined digest HTML, one <ul> of papers per interest
+        reported: Versionless arXiv identifiers the user has already received
+
+    Returns:
+        The filtered HTML and the identifiers of the papers it still links to
+    """
+    seen = set(reported)
+    kept: List[str] = []
+
+    def filter_item(match: re.Match) -> str:
+        ids = extract_paper_ids(match.group(0))
+        if ids and all(paper in seen for paper in ids):
+            return ""
+        seen.update(ids)
+        kept.extend(ids)
+        return match.group(0)
+
+    filtered = _LIST_ITEM.sub(filter_item, html)
+    filtered = _EMPTY_LIST.sub(r"\1<li>No new papers since your last digest.</li>\3", filtered)
+    return filtered, kept
+
+
+def assemble_digest(fragments: List[Tuple[str, List[str]]], reported: Set[str]) -> Tuple[str, List[str]]:
+    """
+    Join per-interest fragments into a digest, with the same result as `drop_reported_papers` on the joined HTML
+
+    Each fragment is `drop_reported_papers(summary, set())` of one interest summary, computed once and
+    shared by every user with that interest. A fragment linking no paper reported or shown earlier is
+    used as is, so most users cost a set check per fragment instead of a regex pass over their digest.
+    """
+    seen = set(reported)
+    parts: List[str] = []
+    kept: List[str] = []
+    for html, paper_ids in fragments:
+        if not seen.isdisjoint(paper_ids):
+            html, paper_ids = drop_reported_papers(html, seen)
+        seen.update(paper_ids)
+        kept.extend(paper_ids)
+        parts.append(html)
+    return "\n".join(parts), kept
+
+
+class WatermarkStore:
+    """
+    Persisted high-water marks per source and scope, the entries fetched recently from each source,
+    and the papers already reported to each user
+
+    A watermark remembers the newest item seen (published timestamp and entry ID) for a source such
+    as an arXiv category set or an interest. Each run reads the window start once and keeps it for
+    the whole run date, so a resumed run sees the same window, and a delayed or skipped run picks up
+    everything published since the last one.
+    """
+
+    def __init__(self, db_path: str = "data/watermarks.db"):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS watermarks (
+                    source TEXT NOT NULL,
+                    scope TEXT NOT NULL,
+                    run_date TEXT NOT NULL,
+                    window_start TEXT NOT NULL,
+                    published TEXT,
+                    entry_id TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (source, scope)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS seen_entries (
+                    source TEXT NOT NULL,
+                    entry_id TEXT NOT NULL,
+                    published TEXT NOT NULL,
+                    PRIMARY KEY (source, entry_id)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS reported_papers (
+                    user_id TEXT NOT NULL,
+                    paper_id TEXT NOT NULL,
+                    run_date TEXT NOT NULL,
+                    PRIMARY KEY (user_id, paper_id)
+                )
+            """)
+        logging.info(f"WatermarkStore initialized at {db_path}")
+
+    def get(self, source: str, scope: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT run_date, window_start, published, entry_id FROM watermarks WHERE source = ? AND scope = ?",
+                (source, scope)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"run_date": row[0], "window_start": row[1], "published": row[2], "entry_id": row[3]}
+
+    def window_start(self, source: str, scope: str, run_date: str, default_start: datetime) -> datetime:
+        """
+        Start of the fetch window for this run
+
+        The first run of a day starts the window at the watermark, and later calls on the same
+        run date return the same start. Without a watermark the window starts at `default_start`.
+        """
+        with self._lock, self.conn:
+            # Shards share the store, so the read and update happen under the database write lock
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute(
+                "SELECT run_date, window_start, published FROM watermarks WHERE source = ? AND scope = ?",
+                (source, scope)
+            ).fetchone()
+            if row is None:
+                start = default_start.isoformat()
+                self.conn.execute(
+                    "INSERT INTO watermarks (source, scope, run_date, window_start, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (source, scope, run_date, start, time.time())
+                )
+            elif row[0] == run_date:
+                start = row[1]
+            else:
+                start = row[2] or row[1]
+                self.conn.execute(
+                    "UPDATE watermarks SET run_date = ?, window_start = ?, updated_at = ? WHERE source = ? AND scope = ?",
+                    (run_date, start, time.time(), source, scope)
+                )
+        return datetime.fromisoformat(start)
+
+    def advance(self, source: str, scope: str, published: str, entry_id: Optional[str] = None) -> bool:
+        """Move the watermark forward to the given item. Returns False if the watermark is already newer."""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "UPDATE watermarks SET published = ?, entry_id = ?, updated_at = ? "
+                "WHERE source = ? AND scope = ? AND (published IS NULL OR published < ?)",
+                (published, entry_id, time.time(), source, scope, published)
+            )
+        return cursor.rowcount == 1
+
+    def unseen(self, source: str, entries: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Entries (dictionaries with `id` and `published`) not fetched from the source before"""
+        with self._lock:
+            seen = {row[0] for row in self.conn.execute("SELECT entry_id FROM seen_entries WHERE source = ?", (source,))}
+        return [entry for entry in entries if entry["id"] not in seen]
+
+    def mark_seen(self, source: str, entries: List[Dict[str, str]], before: Optional[datetime] = None):
+        """Remember fetched entries, forgetting those published before `before`"""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO seen_entries (source, entry_id, published) VALUES (?, ?, ?)",
+                [(source, entry["id"], entry["published"]) for entry in entries]
+            )
+            if before is not None:
+                self.conn.execute(
+                    "DELETE FROM seen_entries WHERE source = ? AND substr(published, 1, 10) < ?",
+                    (source, before.strftime("%Y-%m-%d"))
+                )
+
+    def reported(self, user_id: str, paper_ids: Iterable[str]) -> Set[str]:
+        """Subset of the given paper IDs already reported to the user"""
+        paper_ids = list(paper_ids)
+        if not paper_ids:
+            return set()
+        placeholders = ", ".join("?" for _ in paper_ids)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT paper_id FROM reported_papers WHERE user_id = ? AND paper_id IN ({placeholders})",
+                [user_id] + paper_ids
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_reported(self, user_id: str, paper_ids: Iterable[str], run_date: str):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO reported_papers (user_id, paper_id, run_date) VALUES (?, ?, ?)",
+                [(user_id, paper, run_date) for paper in paper_ids]
+            )
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
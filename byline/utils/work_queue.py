@@ -0,0 +1,119 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+# Claimed for sending when a previous run crashed; the send may or may not have gone out
+UNKNOWN = "unknown"
+
+
+class DigestQueue:
+    """Durable queue of rendered digests between the generation and delivery stages, backed by SQLite
+
+    Each (run_date, user_id) row doubles as a checkpoint: producers skip users that already
+    have a digest for the run, and the consumer only sends rows that are still pending.
+    """
+
+    def __init__(self, db_path: str = "data/digests.db"):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS digests (
+                    run_date TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    html TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (run_date, user_id)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS digests_status ON digests(run_date, status)")
+        logging.info(f"DigestQueue initialized at {db_path}")
+
+    def recover(self, run_date: str) -> int:
+        """Flag digests left mid-send by a crashed run so they are never sent twice. Returns the number flagged."""
+        with self._lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT email FROM digests WHERE run_date = ? AND status = ?", (run_date, SENDING)
+            ).fetchall()
+            self.conn.execute(
+                "UPDATE digests SET status = ?, updated_at = ? WHERE run_date = ? AND status = ?",
+                (UNKNOWN, time.time(), run_date, SENDING)
+            )
+        for (email,) in rows:
+            logging.warning(f"Digest for {email} was interrupted mid-send; not resending to avoid a duplicate")
+        return len(rows)
+
+    def has_digest(self, run_date: str, user_id: str) -> bool:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM digests WHERE run_date = ? AND user_id = ?", (run_date, user_id)
+            ).fetchone()
+        return row is not None
+
+    def put(self, run_date: str, user_id: str, email: str, subject: str, html: str) -> bool:
+        """Enqueue a rendered digest. Returns False if the user already has one for this run."""
+        now = time.time()
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO digests (run_date, user_id, email, subject, html, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_date, user_id, email, subject, html, PENDING, now, now)
+            )
+        return cursor.rowcount == 1
+
+    def claim(self, run_date: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Atomically move up to `limit` pending digests to the sending state and return them"""
+        with self._lock, self.conn:
+            # Take the write lock before reading, so shards sharing the database never claim the same rows
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                "SELECT user_id, email, subject, html FROM digests WHERE run_date = ? AND status = ? ORDER BY created_at LIMIT ?",
+                (run_date, PENDING, limit)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE digests SET status = ?, updated_at = ? WHERE run_date = ? AND user_id = ?",
+                [(SENDING, time.time(), run_date, row[0]) for row in rows]
+            )
+        return [{"user_id": row[0], "email": row[1], "subject": row[2], "html": row[3]} for row in rows]
+
+    def mark(self, run_date: str, user_id: str, status: str, error: str = None):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE digests SET status = ?, last_error = ?, updated_at = ? WHERE run_date = ? AND user_id = ?",
+                (status, error, time.time(), run_date, user_id)
+            )
+
+    def pending_run_dates(self) -> List[str]:
+        """Run dates that still have digests waiting to be sent, or left mid-send, oldest first"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT run_date FROM digests WHERE status IN (?, ?) ORDER BY run_date", (PENDING, SENDING)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def counts(self, run_date: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT status, COUNT(*) FROM digests WHERE run_date = ? GROUP BY status", (run_date,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -1,70 +1,298 @@
 import logging
 import argparse
-import json
-from byline.utils.supabase_client import SupabaseClient
-from byline.services.email_service import EmailService
+import os
+from datetime import datetime, timedelta
 from byline.utils.setup import setup_logging, load_environment_variables
-from byline.services.summary_agent import ExecutiveSummaryAgent
-from byline.utils.dataloaders import load_test_users
+from byline.utils.concurrency import service_limits
+from byline.utils.tracing import tracer
+
+# Services are imported inside the branches that use them, so each mode (and --help) only loads the
+# clients it needs. openai, supabase, yagmail, arxiv, numpy and PyPDF2 each take tens to hundreds of ms.
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Executive Summary Agent")
     parser.add_argument("--test", action="store_true", help="Use test data from user_interests.json")
+    parser.add_argument("--categories", nargs="+", default=None,
+                        help="arXiv categories to harvest before processing users (default: a broad CS, stats and quantum set)")
+    parser.add_argument("--no-harvest", action="store_true", help="Skip the daily harvest and search arXiv live for every interest")
+    parser.add_argument("--no-rank", action="store_true", help="Skip the local pre-ranking of harvested papers per interest")
+    parser.add_argument("--no-watermarks", action="store_true",
+                        help="Fetch a fixed one-day window instead of everything since the last run, and do not track reported papers")
+    parser.add_argument("--single-pass", action="store_true",
+                        help="Write each user's digest in one agent conversation instead of one per interest")
+    parser.add_argument("--no-paper-summaries", action="store_true",
+                        help="Let the agent write paper summaries in every digest instead of composing digests from "
+                             "short per-paper summaries written once and shared across users and runs (per shard when sharded)")
+    parser.add_argument("--plan-model", default="gpt-4.1-mini",
+                        help="Model that searches and selects papers when paper summaries are written separately")
+    parser.add_argument("--write-model", default="gpt-4.1", help="Model that writes the summaries users read")
+    parser.add_argument("--batch", action="store_true",
+                        help="Select and summarize papers for all interests through the OpenAI Batch API before processing users")
+    parser.add_argument("--batch-poll-interval", type=float, default=60.0, help="Seconds between batch status checks")
+    parser.add_argument("--batch-timeout", type=float, default=4 * 3600,
+                        help="Seconds to wait for the batch before cancelling it and summarizing interactively (default: "
+                             "4 hours, leaving time within GitHub Actions' 6-hour job limit for the fallback and delivery)")
+    parser.add_argument("--read-papers", action="store_true",
+                        help="Let the agent download and read full paper PDFs, cached on disk across users and runs")
+    parser.add_argument("--stage", choices=["all", "generate", "deliver"], default="all",
+                        help="Run generation and delivery together, or only one side of the digest queue")
+    parser.add_argument("--run-date", default=None,
+                        help="Run the digest queue is keyed by, as YYYY-MM-DD (default: today). Pass the same date to "
+                             "a rerun or to --stage deliver to resume a run that started on an earlier day. Without it, "
+                             "--stage deliver sends every pending digest regardless of its run date")
+    parser.add_argument("--report", default=None,
+                        help="Path of the JSON run report (default run_report.json, or one file per shard)")
+    parser.add_argument("--shard-index", type=int, default=0, help="Shard of users processed by this run, from 0 to --shard-count - 1")
+    parser.add_argument("--shard-count", type=int, default=1, help="Number of shards users are split across by a stable hash of their ID")
+    parser.add_argument("--snapshot", default=None,
+                        help="Shared arXiv snapshot file: read instead of harvesting, or written with --harvest-only")
+    parser.add_argument("--harvest-only", action="store_true",
+                        help="Harvest and index today's papers, then exit without processing users")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the on-disk LLM and arXiv result cache")
+    parser.add_argument("--max-agent-iterations", type=int, default=5, help="Maximum model calls per interest summary")
+    parser.add_argument("--max-input-tokens", type=int, default=60000, help="Maximum input tokens spent per interest summary")
+    parser.add_argument("--workers", type=int, default=4, help="Number of users processed concurrently")
+    parser.add_argument("--interest-workers", type=int, default=4, help="Number of interest summaries generated concurrently")
+    parser.add_argument("--openai-concurrency", type=int, default=8, help="Maximum concurrent OpenAI requests")
+    parser.add_argument("--arxiv-concurrency", type=int, default=1, help="Maximum concurrent arXiv API requests")
+    parser.add_argument("--arxiv-delay", type=float, default=None,
+                        help="Minimum seconds between arXiv API requests (default: the 3 seconds arXiv asks for)")
+    parser.add_argument("--smtp-concurrency", type=int, default=2, help="Number of pooled SMTP connections sending concurrently")
+    parser.add_argument("--smtp-rate", type=float, default=None, help="Maximum emails sent per second")
     args = parser.parse_args()
+    if not 0 <= args.shard_index < args.shard_count:
+        parser.error("--shard-index must be between 0 and --shard-count - 1")
+    if args.harvest_only and (args.stage == "deliver" or args.no_harvest):
+        parser.error("--harvest-only cannot be combined with --stage deliver or --no-harvest")
+    if args.batch and (args.no_harvest or args.no_rank or args.no_paper_summaries or args.single_pass):
+        parser.error("--batch needs the harvest, ranking and paper summaries, and cannot be combined with --single-pass")
+    if args.run_date is not None:
+        try:
+            datetime.strptime(args.run_date, "%Y-%m-%d")
+        except ValueError:
+            parser.error("--run-date must be a date in YYYY-MM-DD format")
+    if args.report is None:
+        args.report = f"run_report.shard{args.shard_index}of{args.shard_count}.json" if args.shard_count > 1 else "run_report.json"
+    sharded = args.shard_count > 1
+    # A shard given a shared snapshot never harvests, prunes or otherwise rewrites the shared paper stores
+    read_only_papers = args.snapshot is not None and not args.harvest_only
+    
+    generate = not args.harvest_only and args.stage != "deliver"
+    deliver = not args.harvest_only and args.stage != "generate"
+    required = []
+    if generate:
+        required.append("OPENAI_API_KEY")
+        if not args.test:
+            required.extend(["SUPABASE_URL", "SUPABASE_SERVICE_KEY"])
+    if deliver:
+        required.extend(["SENDER_EMAIL", "SENDER_PASSWORD"])
     
     setup_logging()
-    env_vars = load_environment_variables()
+    env_vars = load_environment_variables(required)
+    service_limits.configure(openai=args.openai_concurrency, arxiv=args.arxiv_concurrency, smtp=args.smtp_concurrency)
     
     try:
-        logging.info("Initializing services...")
-        agent = ExecutiveSummaryAgent(env_vars["OPENAI_API_KEY"])
-        email_service = EmailService(env_vars["SENDER_EMAIL"], env_vars["SENDER_PASSWORD"])
-
-        if not args.test:
-            supabase_client = SupabaseClient(env_vars["SUPABASE_URL"], env_vars["SUPABASE_SERVICE_KEY"])
-            logging.info("Fetching all users from Supabase...")
-            users = supabase_client.get_all_users()
-        else:
-            logging.info("Loading test users from user_interests.json...")
-            users = load_test_users("data/user_interests.json")
+        from byline.utils.work_queue import DigestQueue
         
-        if not users:
-            logging.warning("No users found. Exiting.")
-            exit(0)
+        email_service = None
+        digest_queue = None if args.harvest_only else DigestQueue()
+        if deliver:
+            from byline.services.email_delivery import RetryQueue
+            from byline.services.email_service import EmailService
+            
+            email_service = EmailService(
+                env_vars["SENDER_EMAIL"],
+                env_vars["SENDER_PASSWORD"],
+                pool_size=args.smtp_concurrency,
+                rate_limit=args.smtp_rate,
+                # Each shard keeps its own queue, so shards never resend each other's failed emails
+                retry_queue=RetryQueue(f"data/email_retry.shard{args.shard_index}of{args.shard_count}.db" if sharded else "data/email_retry.db")
+            )
+        cache = None
+        stats = {}
         
-        logging.info(f"Processing {len(users)} users...")
+        if deliver:
+            sent, still_failing = email_service.retry_failed()
+            if sent or still_failing:
+                logging.info(f"Retried queued emails: {sent} sent, {still_failing} still failing")
         
-        for user in users:
-            try:
-                logging.info(f"Processing user: {user.email}")
+        if args.stage == "deliver":
+            from byline.pipeline import deliver_digests
+            
+            logging.info("Delivering queued digests...")
+            stats = {"sent": 0, "failed": 0}
+            for run_date in [args.run_date] if args.run_date else digest_queue.pending_run_dates():
+                digest_queue.recover(run_date)
+                delivered = deliver_digests(digest_queue, email_service, run_date)
+                stats = {key: stats[key] + delivered[key] for key in stats}
+        else:
+            from byline.utils.http_client import ARXIV_DELAY_SECONDS, arxiv_http
+            from byline.utils.watermarks import WatermarkStore
+            
+            arxiv_delay = ARXIV_DELAY_SECONDS if args.arxiv_delay is None else args.arxiv_delay
+            arxiv_http.configure(rate=1 / arxiv_delay if arxiv_delay > 0 else None)
+            paper_index = None
+            ranker = None
+            watermarks = None if args.no_watermarks else WatermarkStore()
+            if not args.no_harvest:
+                from byline.services.arxiv_harvest import ArxivHarvester, PaperSnapshot, DEFAULT_CATEGORIES
+                from byline.services.paper_index import PaperIndex
                 
-                if not user.user_interests:
-                    logging.warning(f"User {user.email} has no interests. Skipping.")
-                    continue
+                try:
+                    if read_only_papers:
+                        logging.info(f"Loading shared arXiv snapshot from {args.snapshot}...")
+                        snapshot = PaperSnapshot.load(args.snapshot)
+                    else:
+                        logging.info("Harvesting new arXiv submissions...")
+                        snapshot = ArxivHarvester(watermarks=watermarks).load_or_harvest(args.categories or DEFAULT_CATEGORIES)
+                        if args.snapshot is not None:
+                            snapshot.save(args.snapshot)
+                            logging.info(f"Saved shared arXiv snapshot to {args.snapshot}")
+                    if not read_only_papers:
+                        paper_index = PaperIndex()
+                        with tracer.span("index.refresh"):
+                            paper_index.add_papers(snapshot.papers, seen_at=snapshot.harvested_at)
+                            # Searches reach back to an interest's watermark, which can trail by weeks
+                            paper_index.prune(datetime.now() - timedelta(days=30))
+                    elif os.path.exists("data/index/papers.db"):
+                        # The harvest job ships the index it built alongside the snapshot
+                        paper_index = PaperIndex(read_only=True)
+                    else:
+                        logging.warning("No shared paper index found, indexing the snapshot in memory")
+                        paper_index = PaperIndex(":memory:")
+                        paper_index.add_papers(snapshot.papers, seen_at=snapshot.harvested_at)
+                except Exception as e:
+                    if args.harvest_only:
+                        raise
+                    logging.error(f"arXiv harvest failed, falling back to live search: {e}")
+                    paper_index = None
                 
-                all_summaries = []
-                for user_interest in user.user_interests:
-                    logging.info(f"Generating executive summary for interest: {user_interest.interest}")
-                    summary = agent.create_executive_summary(user_interest)
-                    all_summaries.append(summary)
+                if paper_index is not None and not args.no_rank:
+                    from byline.services.paper_ranker import PaperRanker
+                    
+                    # Read-only shards embed papers missing from the shipped vectors in memory only
+                    ranker = PaperRanker(read_only=read_only_papers)
+                    with tracer.span("ranker.refresh"):
+                        if not read_only_papers:
+                            ranker.prune(datetime.now() - timedelta(days=7))
+                        ranker.add_papers(snapshot.papers)
+            
+            if args.harvest_only:
+                logging.info(f"Harvest complete: {len(snapshot.papers)} papers indexed")
+                stats = {"papers": len(snapshot.papers)}
+            else:
+                from byline.pipeline import run_pipeline
+                from byline.services.agent_context import ContextBudget
+                from byline.services.summary_agent import ExecutiveSummaryAgent, ModelRoutes
+                from byline.utils.cache import DiskCache
                 
-                combined_summary = "\n".join(all_summaries)
+                logging.info("Initializing services...")
+                # Fixed for the whole run, so work that crosses midnight stays keyed to the day it started
+                run_date = args.run_date or datetime.now().strftime("%Y-%m-%d")
+                cache = None if args.no_cache else DiskCache()
+                budget = ContextBudget(max_iterations=args.max_agent_iterations, max_input_tokens=args.max_input_tokens)
+                paper_reader = None
+                if args.read_papers:
+                    from byline.services.paper_reader import PaperReader, PaperTextCache
+                    
+                    paper_reader = PaperReader(PaperTextCache())
+                paper_summary_store = None
+                if not args.no_paper_summaries:
+                    from byline.services.paper_summaries import PaperSummaryStore
+                    
+                    # Each machine (and in CI, each shard) keeps its own store, so it is pruned here even on shards
+                    paper_summary_store = PaperSummaryStore()
+                    paper_summary_store.prune(datetime.now() - timedelta(days=30))
+                agent = ExecutiveSummaryAgent(env_vars["OPENAI_API_KEY"], paper_store=paper_index, cache=cache, budget=budget, ranker=ranker,
+                                              watermarks=watermarks, paper_reader=paper_reader, paper_summary_store=paper_summary_store,
+                                              routes=ModelRoutes(plan=args.plan_model, write=args.write_model), run_date=run_date)
+
+                if not args.test:
+                    from byline.utils.supabase_client import SupabaseClient
+                    
+                    supabase_client = SupabaseClient(env_vars["SUPABASE_URL"], env_vars["SUPABASE_SERVICE_KEY"])
+                    logging.info("Streaming users from Supabase...")
+                    users = supabase_client.iter_users(shard_index=args.shard_index, shard_count=args.shard_count)
+                else:
+                    from byline.utils.dataloaders import iter_test_users
+                    
+                    logging.info("Loading test users from user_interests.json...")
+                    users = iter_test_users("data/user_interests.json", args.shard_index, args.shard_count)
                 
-                logging.info(f"Sending executive summary via email to {user.email}...")
-                email_sent = email_service.send_executive_summary(user, combined_summary)
+                batch_stats = None
+                if args.batch:
+                    if ranker is None:
+                        logging.warning("No harvested papers to rank, skipping the batch and summarizing interactively")
+                    else:
+                        from byline.services.openai_batch import BatchRunner
+                        
+                        # The batch needs every distinct interest up front, so users are loaded before processing
+                        users = list(users)
+                        interests = [
+                            user_interest for user in users if not digest_queue.has_digest(run_date, user.id)
+                            for user_interest in user.user_interests
+                        ]
+                        runner = BatchRunner(agent.client, poll_interval=args.batch_poll_interval, timeout=args.batch_timeout)
+                        try:
+                            with tracer.span("openai_batch.prepare"):
+                                batch_stats = agent.prepare_batch(interests, runner, run_date, workers=args.interest_workers)
+                        except Exception as e:
+                            logging.error(f"Batch preparation failed, summarizing interactively: {e}")
                 
-                if email_sent:
-                    logging.info(f"Executive summary sent successfully to {user.email}")
-                else:
-                    logging.error(f"Failed to send email to {user.email}")
+                if sharded:
+                    logging.info(f"Processing shard {args.shard_index} of {args.shard_count} (0-based)")
+                logging.info(f"Processing users with {args.workers} workers...")
                 
-            except Exception as e:
-                logging.error(f"Error processing user {user.email}: {e}")
-                continue
+                stats = run_pipeline(
+                    users,
+                    agent,
+                    email_service,
+                    digest_queue,
+                    run_date=run_date,
+                    workers=args.workers,
+                    interest_workers=args.interest_workers,
+                    deliver=deliver,
+                    watermarks=watermarks,
+                    single_pass=args.single_pass
+                )
+                stats["batch"] = batch_stats
+                
+                if stats["users"] == 0:
+                    logging.warning("No users found.")
+                else:
+                    logging.info("All users processed.")
+                agent.close()
+                if paper_summary_store is not None:
+                    paper_summary_store.close()
+            if watermarks is not None:
+                watermarks.close()
+        
+        if email_service is not None:
+            # Drain once more before exiting: sends that failed early in this run are usually due by now
+            sent, still_failing = email_service.retry_failed()
+            if sent or still_failing:
+                logging.info(f"Retried queued emails at end of run: {sent} sent, {still_failing} still failing")
+            stats["email_retries"] = {"sent": sent, "still_failing": still_failing, "queued": len(email_service.retry_queue)}
+            email_service.retry_queue.close()
+            email_service.close()
+        if digest_queue is not None:
+            digest_queue.close()
         
-        logging.info("All users processed.")
+        if cache is not None:
+            cache_stats = cache.stats()
+            for namespace, counts in cache_stats["namespaces"].items():
+                logging.info(
+                    f"Cache [{namespace}]: {counts['hits']} hits, {counts['misses']} misses, "
+                    f"{counts['bytes_read']} bytes read, {counts['bytes_written']} bytes written"
+                )
+            logging.info(f"Cache size on disk: {cache_stats['size_bytes']} bytes")
         
-        email_service.close()
+        tracer.write_report(args.report, extra={
+            "stage": "harvest" if args.harvest_only else args.stage,
+            "shard": {"index": args.shard_index, "count": args.shard_count},
+            "pipeline": stats,
+            "cache": cache.stats() if cache is not None else None
+        })
         
     except Exception as e:
         logging.error(f"Error in main execution: {e}")
@@ -0,0 +1,53 @@
+"""
+Tests for the agent's context budget: the iteration cap on model calls per conversation.
+
+Usage:
+    python -m pytest tests
+"""
+from types import SimpleNamespace
+import pytest
+from byline.services.agent_context import AgentContext, ContextBudget
+from byline.services.arxiv_harvest import PaperSnapshot
+from byline.services.summary_agent import ExecutiveSummaryAgent
+
+
+class SearchingResponses:
+    """responses.create stand-in that asks for another search whenever tools are allowed"""
+
+    def __init__(self):
+        self.tool_choices = []
+
+    def create(self, model, input, tools, tool_choice, max_output_tokens):
+        self.tool_choices.append(tool_choice)
+        usage = SimpleNamespace(input_tokens=100, output_tokens=10)
+        if tool_choice == "none":
+            return SimpleNamespace(output=[], output_text="<h3>Done</h3>", usage=usage)
+        call = SimpleNamespace(
+            type="function_call", call_id=f"call_{len(self.tool_choices)}", name="search_arxiv_papers",
+            arguments='{"query": "agents"}'
+        )
+        return SimpleNamespace(output=[call], output_text="", usage=usage)
+
+
+@pytest.fixture
+def agent():
+    agent = ExecutiveSummaryAgent("sk-test", paper_store=PaperSnapshot([]))
+    agent.client = SimpleNamespace(responses=SearchingResponses())
+    yield agent
+    agent.close()
+
+
+@pytest.mark.parametrize("max_iterations", [1, 2, 5])
+def test_model_calls_stop_at_the_iteration_cap(agent, max_iterations):
+    context = AgentContext("Summarize", ContextBudget(max_iterations=max_iterations))
+    assert agent._run_conversation(context, "test") == "<h3>Done</h3>"
+    tool_choices = agent.client.responses.tool_choices
+    assert len(tool_choices) == context.iterations == max_iterations
+    assert tool_choices == ["auto"] * (max_iterations - 1) + ["none"]
+
+
+def test_input_token_budget_forces_the_final_answer(agent):
+    context = AgentContext("Summarize", ContextBudget(max_iterations=10, max_input_tokens=250))
+    agent._run_conversation(context, "test")
+    # 100 tokens per call: after two calls a third tool round would cross 250
+    assert agent.client.responses.tool_choices == ["auto", "auto", "none"]
@@ -0,0 +1,116 @@
+"""
+Tests for pooled SMTP delivery, reconnects and the persistent retry queue, against a local SMTP sink.
+
+Usage:
+    python -m pytest tests
+"""
+import pytest
+import yagmail
+from benchmarks.smtp_sink import SMTPSink
+from byline.models.user_models import User
+from byline.services.email_delivery import RetryQueue, SMTPConnectionPool
+from byline.services.email_service import EmailService
+from byline.utils.concurrency import service_limits
+
+HTML = "<p>digest</p>"
+
+
+@pytest.fixture
+def sink():
+    sink = SMTPSink().start()
+    service_limits.configure(smtp=4)
+    yield sink
+    sink.stop()
+
+
+@pytest.fixture
+def retry_queue(tmp_path):
+    queue = RetryQueue(str(tmp_path / "email_retry.db"), max_attempts=3, base_delay=0)
+    yield queue
+    queue.close()
+
+
+def make_service(sink, retry_queue=None, pool_size=2) -> EmailService:
+    return EmailService("test@example.com", None, pool_size=pool_size, retry_queue=retry_queue, **sink.smtp_options())
+
+
+def test_pool_reuses_connections(sink):
+    opened = []
+
+    def factory():
+        conn = yagmail.SMTP("test@example.com", None, **sink.smtp_options())
+        opened.append(conn)
+        return conn
+
+    pool = SMTPConnectionPool(factory, size=2)
+    for _ in range(5):
+        with pool.connection() as conn:
+            conn.smtp.noop()
+    assert len(opened) == 1
+    pool.close()
+    assert all(conn.is_closed for conn in opened)
+
+
+def test_pool_replaces_broken_connection(sink):
+    pool = SMTPConnectionPool(lambda: yagmail.SMTP("test@example.com", None, **sink.smtp_options()), size=1)
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            raise RuntimeError("send failed")
+    with pool.connection() as conn:
+        conn.smtp.noop()
+    assert len(pool._all) == 1
+    pool.close()
+
+
+def test_send_many(sink):
+    service = make_service(sink, pool_size=4)
+    users = [User(id=str(i), email=f"user{i}@example.com", user_interests=[]) for i in range(20)]
+    assert service.send_many((user, HTML) for user in users) == 20
+    assert sink.messages == 20
+    service.close()
+
+
+def test_reconnects_after_disconnect(sink, retry_queue):
+    service = make_service(sink, retry_queue)
+    assert service.send_rendered("user@example.com", "subject", HTML)
+    sink.disconnects = 1
+    assert service.send_rendered("user@example.com", "subject", HTML)
+    assert service.pool.reconnects == 1
+    assert sink.messages == 2
+    assert len(retry_queue) == 0
+    service.close()
+
+
+def test_failed_send_is_queued_and_retried(sink, retry_queue):
+    service = make_service(sink, retry_queue)
+    sink.rejecting = True
+    assert not service.send_rendered("user@example.com", "subject", HTML)
+    assert len(retry_queue) == 1
+    assert service.retry_failed() == (0, 1)
+    assert retry_queue.due()[0]["attempts"] == 2
+
+    sink.rejecting = False
+    assert service.retry_failed() == (1, 0)
+    assert len(retry_queue) == 0
+    assert sink.messages == 1
+    service.close()
+
+
+def test_retry_queue_gives_up_after_max_attempts(retry_queue):
+    retry_queue.enqueue("user@example.com", "subject", HTML, "refused")
+    for _ in range(retry_queue.max_attempts - 1):
+        (entry,) = retry_queue.due()
+        retry_queue.mark_failed(entry["id"], "refused")
+    assert len(retry_queue) == 0
+
+
+def test_retry_queue_backoff_and_persistence(tmp_path):
+    path = str(tmp_path / "email_retry.db")
+    queue = RetryQueue(path, base_delay=3600)
+    queue.enqueue("user@example.com", "subject", HTML, "refused")
+    assert queue.due() == []
+    queue.close()
+
+    reopened = RetryQueue(path, base_delay=3600)
+    assert len(reopened) == 1
+    reopened.close()
@@ -0,0 +1,66 @@
+"""
+Tests for concurrent tool dispatch: per-tool limits, timeouts and shutdown.
+
+Usage:
+    python -m pytest tests
+"""
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from byline.services.tool_registry import Tool, ToolRegistry
+
+
+def call(name: str, arguments: str = "{}"):
+    return SimpleNamespace(name=name, arguments=arguments)
+
+
+@pytest.fixture
+def registry():
+    registry = ToolRegistry(max_workers=4)
+    yield registry
+    registry.close()
+
+
+def test_dispatch_returns_outputs_in_call_order(registry):
+    registry.register(Tool("echo", "Echo", {}, handler=lambda context, value: {"value": value}))
+    outputs = registry.dispatch([call("echo", '{"value": 1}'), call("missing"), call("echo", "not json")])
+    assert outputs[0] == {"value": 1}
+    assert outputs[1] == {"error": "Unknown tool: missing"}
+    assert outputs[2]["error"].startswith("Invalid arguments for echo")
+
+
+def test_timed_out_call_releases_its_slot(registry):
+    release = threading.Event()
+
+    def handler(context, hang):
+        if hang:
+            release.wait(5)
+        return {"ok": True}
+
+    registry.register(Tool("slow", "Slow", {}, handler=handler, max_concurrency=1, timeout=0.2))
+    assert "timed out" in registry.dispatch([call("slow", '{"hang": true}')])[0]["error"]
+
+    # The first call is still hung, but the tool's only slot is free for the next one
+    start = time.monotonic()
+    assert registry.dispatch([call("slow", '{"hang": false}')]) == [{"ok": True}]
+    assert time.monotonic() - start < 0.2
+    release.set()
+
+
+def test_call_waiting_for_a_slot_times_out(registry):
+    release = threading.Event()
+    registry.register(Tool("busy", "Busy", {}, handler=lambda context: release.wait(5) and {"ok": True},
+                           max_concurrency=1, timeout=0.2))
+    outputs = registry.dispatch([call("busy"), call("busy")])
+    assert all("timed out" in output["error"] for output in outputs)
+    release.set()
+
+
+def test_close_stops_the_workers():
+    registry = ToolRegistry(max_workers=2)
+    registry.register(Tool("echo", "Echo", {}, handler=lambda context: {"ok": True}))
+    registry.dispatch([call("echo")])
+    registry.close()
+    with pytest.raises(RuntimeError):
+        registry.executor.submit(lambda: None)